@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from backend.app.api.routes import auth, users, assessments, chat, sleep, hr, wearables
+from backend.app.api.routes import auth, users, assessments, chat, sleep, hr, wearables, analytics, exports
 
 api_router = APIRouter()
 
@@ -10,4 +10,6 @@ api_router.include_router(assessments.router, prefix="/assessments", tags=["asse
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
 api_router.include_router(sleep.router, prefix="/sleep", tags=["sleep"])
 api_router.include_router(hr.router, prefix="/hr", tags=["hr"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
 api_router.include_router(wearables.router, prefix="/wearables", tags=["wearables"]) 
\ No newline at end of file
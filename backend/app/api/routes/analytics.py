@@ -0,0 +1,73 @@
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from starlette.concurrency import run_in_threadpool
+
+from backend.app.core.conditional import http_date
+from backend.app.services import analytics
+from backend.app.api.routes.users import check_org_access, require_hr, User
+
+router = APIRouter()
+
+
+def _scope_orgs(org_ids: Optional[List[int]], current_user: User) -> Optional[List[int]]:
+    """Org filter for the caller: admins see any, HR only their own organization."""
+    if current_user.role == "admin":
+        return org_ids
+    if current_user.organization_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member of any organization")
+    if org_ids:
+        check_org_access(current_user, *org_ids)
+    return [current_user.organization_id]
+
+
+async def _report(
+    response: Response,
+    fn: Callable[..., Dict[str, Any]],
+    org_ids: Optional[List[int]],
+    start: Optional[date],
+    end: Optional[date],
+):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        # Parquet scans and NumPy work block; keep them off the event loop
+        report = await run_in_threadpool(fn, org_ids, start, end)
+    except analytics.SnapshotUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    # Reports only change when a new snapshot is published
+    response.headers["Last-Modified"] = http_date(analytics.snapshot_created_at(report["snapshot"]))
+    return report
+
+
+@router.get("/psqi/distribution")
+async def psqi_distribution(
+    response: Response,
+    org_ids: Optional[List[int]] = Query(None, description="Limit to these organizations (repeat the parameter)"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(require_hr),
+) -> Dict[str, Any]:
+    """PSQI percentiles, histogram and healthy share, overall and per organization.
+
+    Computed from the latest analytics snapshot, not live data. Non-admins
+    only see their own organization.
+    """
+    return await _report(response, analytics.psqi_distribution, _scope_orgs(org_ids, current_user), start, end)
+
+
+@router.get("/psqi/sleep-correlation")
+async def psqi_sleep_correlation(
+    response: Response,
+    org_ids: Optional[List[int]] = Query(None, description="Limit to these organizations (repeat the parameter)"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(require_hr),
+) -> Dict[str, Any]:
+    """Correlation of users' PSQI with wearable sleep duration, efficiency and latency.
+
+    Computed from the latest analytics snapshot, not live data. Non-admins
+    only see their own organization.
+    """
+    return await _report(response, analytics.psqi_sleep_correlation, _scope_orgs(org_ids, current_user), start, end)
@@ -1,12 +1,20 @@
-from datetime import datetime, timedelta
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import numpy as np
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy import func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.schemas.assessment import AssessmentIn, AssessmentOut
+from backend.app.core.config import settings
+from backend.app.schemas.assessment import AssessmentIn, AssessmentOut, AssessmentImportOut
 from backend.app.models.sleep_assessment import SleepAssessment
 from backend.app.db.session import get_db
-from backend.app.api.routes.users import get_current_user, User
+from backend.app.services.psqi_aggregates import invalidate_org_kpis, record_assessments
+from backend.app.api.routes.users import get_current_user, require_hr, User
 
 router = APIRouter()
 
@@ -41,6 +49,19 @@ def calculate_psqi_score(answers: dict[str, int]) -> int:
     return total
 
 
+def score_psqi_matrix(components: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized `calculate_psqi_score` over an (n x 7) float array.
+
+    Columns follow `PSQI_COMPONENT_KEYS`; missing or unparsable answers are
+    NaN. Returns (scores, invalid) where `invalid` marks cells that are not
+    an integer in 0-3; scores of rows with any invalid cell are meaningless.
+    """
+    with np.errstate(invalid="ignore"):
+        invalid = np.isnan(components) | (components != np.floor(components)) | (components < 0) | (components > 3)
+    scores = np.where(invalid, 0, components).sum(axis=1).astype(int)
+    return scores, invalid
+
+
 def generate_recommendation(score: int) -> str:
     if score <= 5:
         return "Great sleep quality! Keep it up."
@@ -75,9 +96,187 @@ async def submit_psqi(
         answers=assessment.answers,
     )
     db.add(sa)
+    if current_user.organization_id is not None:
+        # Same transaction as the assessment so the HR aggregate never drifts
+        await db.flush()
+        await record_assessments(db, [sa.id])
     await db.commit()
     await db.refresh(sa)
+    await invalidate_org_kpis(current_user.organization_id)
 
     recommendation = generate_recommendation(score)
 
-    return {"id": sa.id, "type": "PSQI", "answers": assessment.answers, "score": score, "recommendation": recommendation} 
\ No newline at end of file
+    return {"id": sa.id, "type": "PSQI", "answers": assessment.answers, "score": score, "recommendation": recommendation} 
+
+
+# --- Bulk import ---
+IMPORT_ROW_ERRORS_SHOWN = 1000
+IMPORT_READ_CHUNK_BYTES = 1024 * 1024
+# First key of pg_advisory_xact_lock(int, int); the second is the organization
+IMPORT_LOCK_NAMESPACE = 0x50535149  # "PSQI"
+
+
+async def _read_upload(file: UploadFile, limit: int) -> bytes:
+    chunks: list[bytes] = []
+    size = 0
+    while chunk := await file.read(IMPORT_READ_CHUNK_BYTES):
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=f"Uploads are limited to {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _parse_upload(raw: bytes, fmt: str) -> list[dict[str, Any]]:
+    text = raw.decode("utf-8-sig")
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    rows = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Line {line_no} is not valid JSON")
+        if not isinstance(row, dict):
+            raise HTTPException(status_code=400, detail=f"Line {line_no} is not a JSON object")
+        # Answers may be nested like the single-submission payload
+        rows.append({**row, **(row.get("answers") or {})})
+    return rows
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _parse_day(value: Any, today: date) -> date | None:
+    if value in (None, ""):
+        return today
+    try:
+        day = date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+    return day if day <= today else None
+
+
+@router.post("/psqi/import", response_model=AssessmentImportOut)
+async def import_psqi(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON (one object per line)"),
+    fmt: Literal["csv", "ndjson"] | None = Query(None, alias="format", description="Defaults to the file extension"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_hr),
+):
+    """Bulk-import PSQI results for existing users.
+
+    Each row needs an ``email``, the seven component scores 0-3 named as in
+    `PSQI_COMPONENT_KEYS`, and optionally a ``date`` (ISO, defaults to
+    today). Rows are validated and scored together; valid rows are stored
+    in one transaction and invalid ones are reported by row number. A user
+    has at most one PSQI per imported date, so re-importing a file only
+    counts its rows as duplicates. HR can import only for members of their
+    own organization.
+    """
+    if current_user.role != "admin" and current_user.organization_id is None:
+        # Scoping to "organization_id IS NULL" would reach every unaffiliated user
+        raise HTTPException(status_code=403, detail="Not a member of any organization")
+    if fmt is None:
+        fmt = "ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv"
+    try:
+        rows = _parse_upload(await _read_upload(file, settings.assessment_import_max_bytes), fmt)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not parse {fmt} upload: {exc}")
+    if len(rows) > settings.assessment_import_max_rows:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.assessment_import_max_rows} rows per import"
+        )
+
+    components = np.array([[_to_float(row.get(k)) for k in PSQI_COMPONENT_KEYS] for row in rows], dtype=float)
+    components = components.reshape(len(rows), len(PSQI_COMPONENT_KEYS))
+    scores, invalid = score_psqi_matrix(components)
+
+    emails = {str(row.get("email") or "").strip().lower() for row in rows} - {""}
+    user_query = select(User.id, User.email, User.organization_id)
+    if current_user.role != "admin":
+        user_query = user_query.where(User.organization_id == current_user.organization_id)
+    users: dict[str, tuple[int, int | None]] = {}
+    email_list = list(emails)
+    chunk_size = settings.assessment_import_chunk_size
+    for start in range(0, len(email_list), chunk_size):
+        result = await db.execute(user_query.where(func.lower(User.email).in_(email_list[start:start + chunk_size])))
+        users.update({email.lower(): (uid, org_id) for uid, email, org_id in result})
+
+    # Imports into the same organization run one at a time, so the duplicate
+    # check below also covers a file uploaded twice concurrently
+    for org_id in sorted({org_id or 0 for _, org_id in users.values()}):
+        await db.execute(select(func.pg_advisory_xact_lock(IMPORT_LOCK_NAMESPACE, org_id)))
+
+    today = datetime.utcnow().date()
+    errors: list[dict[str, Any]] = []
+    values: list[dict[str, Any]] = []
+    affected: set[int] = set()
+    # Row numbers count the CSV header line so they match what users see in a spreadsheet
+    first_row = 2 if fmt == "csv" else 1
+    for i, row in enumerate(rows):
+        bad = [k for k, flag in zip(PSQI_COMPONENT_KEYS, invalid[i]) if flag]
+        user = users.get(str(row.get("email") or "").strip().lower())
+        day = _parse_day(row.get("date"), today)
+        if bad:
+            error = f"Component scores must be integers 0-3: {', '.join(bad)}"
+        elif user is None:
+            error = "Unknown user email"
+        elif day is None:
+            error = "Invalid or future date"
+        else:
+            answers = {k: int(v) for k, v in zip(PSQI_COMPONENT_KEYS, components[i])}
+            values.append({
+                "user_id": user[0],
+                "type": "PSQI",
+                "score": int(scores[i]),
+                "answers": answers,
+                "created_at": datetime.combine(day, time(), tzinfo=timezone.utc),
+            })
+            if user[1] is not None:
+                affected.add(user[1])
+            continue
+        errors.append({"row": i + first_row, "error": error})
+
+    # Re-importing a file must not count it twice: one PSQI per user and date,
+    # whether stored by an earlier import or repeated within this file
+    stored: set[tuple[int, datetime]] = set()
+    pairs = list({(v["user_id"], v["created_at"]) for v in values})
+    for start in range(0, len(pairs), chunk_size):
+        result = await db.execute(
+            select(SleepAssessment.user_id, SleepAssessment.created_at)
+            .where(SleepAssessment.type == "PSQI")
+            .where(tuple_(SleepAssessment.user_id, SleepAssessment.created_at).in_(pairs[start:start + chunk_size]))
+        )
+        stored.update(result.tuples())
+    new_values = []
+    for value in values:
+        pair = (value["user_id"], value["created_at"])
+        if pair not in stored:
+            stored.add(pair)
+            new_values.append(value)
+    duplicates = len(values) - len(new_values)
+
+    for start in range(0, len(new_values), chunk_size):
+        result = await db.execute(
+            insert(SleepAssessment).values(new_values[start:start + chunk_size]).returning(SleepAssessment.id)
+        )
+        # Add only these rows to the aggregates: a recount would overwrite
+        # what concurrent submissions add in the meantime
+        await record_assessments(db, list(result.scalars()))
+    await db.commit()
+    await invalidate_org_kpis(*affected)
+
+    return {
+        "total": len(rows),
+        "imported": len(new_values),
+        "duplicates": duplicates,
+        "failed": len(errors),
+        "errors": errors[:IMPORT_ROW_ERRORS_SHOWN],
+    }
@@ -6,7 +6,12 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.core.config import settings
-from backend.app.core.security import create_access_token, verify_password
+from backend.app.core.security import (
+    PasswordHasherBusy,
+    create_access_token,
+    hash_password_async,
+    verify_and_update_password_async,
+)
 from backend.app.db.session import get_db
 from backend.app.models.user import User
 from backend.app.schemas.user import UserCreate, UserOut
@@ -15,15 +20,28 @@ from backend.app.schemas.token import Token
 router = APIRouter()
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
 async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     existing = (await db.execute(select(User).where(User.email == user_in.email))).scalar_one_or_none()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    try:
+        hashed_password = await hash_password_async(user_in.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+
     user = User(
         email=user_in.email,
-        hashed_password=User.get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         full_name=user_in.full_name,
     )
     db.add(user)
@@ -35,8 +53,18 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     user = (await db.execute(select(User).where(User.email == form_data.username))).scalar_one_or_none()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    try:
+        valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # Cost parameters changed since this hash was made; upgrade it transparently
+        user.hashed_password = new_hash
+        await db.commit()
 
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token({"sub": str(user.id)}, expires_delta=access_token_expires)
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
+import json
+import logging
+from typing import AsyncIterator
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from starlette.concurrency import run_in_threadpool
 import google.generativeai as genai
-from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 
 from backend.app.core.config import settings
+from backend.app.core.metrics import timed
+from backend.app.db.mongo import messages_col
+from backend.app.services import chat_cache, chat_memory
 from backend.app.api.routes.users import get_current_user, User
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -16,12 +26,6 @@ if settings.gemini_api_key:
     genai.configure(api_key=settings.gemini_api_key)
 
 
-# Mongo client for chat memory
-mongo_client = AsyncIOMotorClient(settings.mongodb_uri)
-chat_db = mongo_client["sleepfix"]
-messages_col = chat_db["chat_messages"]
-
-
 class ChatRequest(BaseModel):
     message: str
 
@@ -30,33 +34,175 @@ class ChatResponse(BaseModel):
     response: str
 
 
+class ChatTurn(BaseModel):
+    id: str
+    timestamp: datetime
+    user_message: str
+    assistant_response: str
+
+
+class ChatHistoryPage(BaseModel):
+    items: list[ChatTurn]
+    next_cursor: str | None = None
+
+
+_model: genai.GenerativeModel | None = None
+
+
+def _get_model() -> genai.GenerativeModel:
+    """Model object shared by all requests (built once, not per chat)."""
+    global _model
+    if _model is None:
+        _model = genai.GenerativeModel(settings.gemini_model)
+    return _model
+
+
 async def _generate_gemini_response(prompt: str) -> str:
-    """Generate a completion using Gemini-Pro synchronously inside a threadpool."""
-    model = genai.GenerativeModel("gemini-pro")
-    result = model.generate_content(prompt)
+    """Generate a full completion with Gemini's async API."""
+    async with timed("gemini", "generate"):
+        result = await _get_model().generate_content_async(prompt)
     # result.text contains plain response
     return result.text
 
 
+async def _stream_gemini_response(prompt: str) -> AsyncIterator[str]:
+    """Yield completion text chunks as Gemini produces them."""
+    # Timed until the last chunk, so this is the full generation time
+    async with timed("gemini", "stream"):
+        response = await _get_model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata) carry nothing to show
+                continue
+            if text:
+                yield text
+
+
+async def _save_exchange(current_user: User | None, message: str, response_text: str) -> None:
+    # Persist user and assistant message pair (anonymously without user id for now)
+    doc = {
+        "timestamp": datetime.utcnow(),
+        "user_message": message,
+        "assistant_response": response_text,
+    }
+    if current_user:
+        doc["user_id"] = current_user.id
+    async with timed("mongo", "insert_message"):
+        await messages_col.insert_one(doc)
+
+
+async def _build_prompt(current_user: User | None, message: str) -> tuple[str, str | None]:
+    """Prefix the message with the user's windowed conversation memory.
+
+    Returns the prompt and the response cache key for it (None when the
+    reply must not be cached). Generic questions skip memory entirely so
+    their replies carry nothing personal and can be shared across users.
+    """
+    cacheable = chat_cache.is_cacheable(message)
+    context = None
+    if current_user is not None and not (cacheable and chat_cache.is_generic(message)):
+        async with timed("mongo", "load_context"):
+            context = await chat_memory.load_context(current_user.id)
+    prompt = chat_memory.build_prompt(context, message) if context is not None else message
+    return prompt, chat_cache.cache_key(message, context) if cacheable else None
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
 @router.post("/", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest, current_user: User | None = Depends(get_current_user)):
+async def chat_endpoint(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User | None = Depends(get_current_user),
+):
     if not settings.gemini_api_key:
         # Return echo response if Gemini key not configured
         return {"response": f"(echo) {request.message}"}
 
     try:
-        response_text: str = await run_in_threadpool(_generate_gemini_response, request.message)
-
-        # Persist user and assistant message pair (anonymously without user id for now)
-        doc = {
-            "timestamp": datetime.utcnow(),
-            "user_message": request.message,
-            "assistant_response": response_text,
-        }
+        prompt, cache_key = await _build_prompt(current_user, request.message)
+        response_text = await chat_cache.get_reply(cache_key) if cache_key else None
+        if response_text is None:
+            response_text = await _generate_gemini_response(prompt)
+            if cache_key:
+                await chat_cache.store_reply(cache_key, response_text)
+        await _save_exchange(current_user, request.message, response_text)
         if current_user:
-            doc["user_id"] = current_user.id
-        await messages_col.insert_one(doc)
-
+            background_tasks.add_task(chat_memory.maybe_summarize, current_user.id, _generate_gemini_response)
         return {"response": response_text}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User | None = Depends(get_current_user),
+):
+    """Stream the reply as Server-Sent Events.
+
+    Emits ``data: {"delta": "..."}`` per chunk, then ``event: done`` with the
+    full text; the transcript is written to Mongo once the stream completes.
+    Failures mid-stream arrive as ``event: error`` since the 200 status has
+    already been sent.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        if not settings.gemini_api_key:
+            text = f"(echo) {request.message}"
+            yield _sse({"delta": text})
+            yield _sse({"response": text}, event="done")
+            return
+
+        parts: list[str] = []
+        try:
+            prompt, cache_key = await _build_prompt(current_user, request.message)
+            cached = await chat_cache.get_reply(cache_key) if cache_key else None
+            if cached is not None:
+                parts.append(cached)
+                yield _sse({"delta": cached})
+            else:
+                async for text in _stream_gemini_response(prompt):
+                    parts.append(text)
+                    yield _sse({"delta": text})
+            response_text = "".join(parts)
+            if cache_key and cached is None:
+                await chat_cache.store_reply(cache_key, response_text)
+            await _save_exchange(current_user, request.message, response_text)
+        except Exception as e:
+            logger.exception("Chat stream failed")
+            yield _sse({"detail": str(e)}, event="error")
+            return
+        yield _sse({"response": response_text}, event="done")
+
+    if current_user:
+        background_tasks.add_task(chat_memory.maybe_summarize, current_user.id, _generate_gemini_response)
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background_tasks,
+    )
+
+
+@router.get("/history", response_model=ChatHistoryPage)
+async def chat_history(
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+):
+    """Page through the current user's chat turns, newest first."""
+    if cursor is not None:
+        try:
+            ObjectId(cursor)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    async with timed("mongo", "history_page"):
+        items, next_cursor = await chat_memory.history_page(current_user.id, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
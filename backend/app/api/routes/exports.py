@@ -0,0 +1,86 @@
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from backend.app.services.exports import (
+    MEDIA_TYPES,
+    encode_rows,
+    gzip_stream,
+    org_assessments_query,
+    org_sleep_query,
+    user_assessments_query,
+    user_readings_query,
+)
+from backend.app.api.routes.users import check_org_access, get_current_user_stream, require_hr_stream, User
+
+router = APIRouter()
+
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def _export(request: Request, stmt: Select, fmt: str, filename: str) -> StreamingResponse:
+    """Stream `stmt` as a download, gzipped when the client accepts it."""
+    body = encode_rows(stmt, fmt)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+def _check_range(start: Optional[date], end: Optional[date]) -> None:
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+
+@router.get("/me/assessments")
+async def export_my_assessments(
+    request: Request,
+    format: ExportFormat = "ndjson",
+    current_user: User = Depends(get_current_user_stream),
+):
+    """Download all of the current user's assessments."""
+    return _export(request, user_assessments_query(current_user.id), format, "assessments")
+
+
+@router.get("/me/wearables")
+async def export_my_wearables(
+    request: Request,
+    format: ExportFormat = "ndjson",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user_stream),
+):
+    """Download the current user's raw wearable readings, provider payloads included."""
+    _check_range(start, end)
+    return _export(request, user_readings_query(current_user.id, start, end), format, "wearable_readings")
+
+
+@router.get("/orgs/{org_id}/assessments")
+async def export_org_assessments(
+    org_id: int,
+    request: Request,
+    format: ExportFormat = "ndjson",
+    current_user: User = Depends(require_hr_stream),
+):
+    """Download every assessment of the organization's members (by user id)."""
+    check_org_access(current_user, org_id)
+    return _export(request, org_assessments_query(org_id), format, f"org_{org_id}_assessments")
+
+
+@router.get("/orgs/{org_id}/sleep")
+async def export_org_sleep(
+    org_id: int,
+    request: Request,
+    format: ExportFormat = "ndjson",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(require_hr_stream),
+):
+    """Download the organization's normalized nightly wearable metrics (by user id)."""
+    _check_range(start, end)
+    check_org_access(current_user, org_id)
+    return _export(request, org_sleep_query(org_id, start, end), format, f"org_{org_id}_sleep")
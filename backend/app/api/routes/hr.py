@@ -1,70 +1,137 @@
-from datetime import datetime, timedelta
-from typing import Dict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.db.session import get_db
-from backend.app.models.organization import Organization
-from backend.app.models.user import User
-from backend.app.models.sleep_assessment import SleepAssessment
-from backend.app.api.routes.users import require_hr, User
+from backend.app.core.conditional import http_date
+from backend.app.db.session import get_read_db, max_cache_ttl
+from backend.app.services.cache import MISSING
+from backend.app.services.psqi_aggregates import (
+    kpi_cache,
+    load_org_timeseries,
+    load_org_window,
+)
+from backend.app.api.routes.users import check_org_access, require_hr, User
 
 router = APIRouter()
 
+MAX_TIMESERIES_ORGS = 200
+
+
+@router.get("/kpis/timeseries")
+async def get_kpi_timeseries(
+    org_ids: List[int] = Query(..., description="Organizations to include (repeat the parameter)"),
+    start: date = Query(...),
+    end: date = Query(...),
+    granularity: Literal["day", "week", "month"] = "week",
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_hr),
+) -> Dict[str, Any]:
+    """PSQI trend per org and period, computed in one grouped SQL pass.
+
+    Each bucket carries the average PSQI, the share of employees whose
+    average is healthy, and both values' change vs the org's previous
+    bucket that had submissions. Only admins may include organizations
+    other than their own.
+    """
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    org_ids = sorted(set(org_ids))
+    check_org_access(current_user, *org_ids)
+    if len(org_ids) > MAX_TIMESERIES_ORGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TIMESERIES_ORGS} organizations per request")
+
+    cache_key = f"timeseries:{','.join(map(str, org_ids))}:{start}:{end}:{granularity}"
+    cached = await kpi_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+    tags = [f"org:{org_id}" for org_id in org_ids]
+    versions = await kpi_cache.tag_versions(*tags)
+
+    series = [
+        {
+            "organization_id": row.org_id,
+            "bucket": row.bucket.date().isoformat(),
+            "average_psqi": round(float(row.avg_psqi), 2),
+            "percent_employees_healthy": round(float(row.healthy_share or 0), 2),
+            "active_employees": row.active_users,
+            "avg_psqi_change": None if row.avg_psqi_change is None else round(float(row.avg_psqi_change), 2),
+            "percent_healthy_change": None if row.healthy_share_change is None else round(float(row.healthy_share_change), 2),
+        }
+        for row in await load_org_timeseries(db, org_ids, start, end, granularity)
+    ]
+    result = {"granularity": granularity, "start": start.isoformat(), "end": end.isoformat(), "series": series}
+    await kpi_cache.set(cache_key, result, tags=tags, ttl=max_cache_ttl(db), versions=versions)
+    return result
+
 
 @router.get("/{org_id}/kpis")
-async def get_org_kpis(org_id: int, db: AsyncSession = Depends(get_db), _: User = Depends(require_hr)) -> Dict[str, float]:
-    """Return average PSQI score for the organization over the last 7 days."""
-    org = (await db.execute(select(Organization).where(Organization.id == org_id))).scalar_one_or_none()
-    if org is None:
+async def get_org_kpis(
+    org_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_hr),
+) -> Dict[str, float]:
+    """Return average PSQI score for the organization over the last 7 days.
+
+    Served from `org_daily_psqi` (at most 14 rows), the headcount and the
+    healthy-employee count grouped in SQL from `org_user_daily_psqi`, all in
+    a single query; see `services/psqi_aggregates.py`. Results are cached
+    per day until an assessment or membership change in the org invalidates
+    them; a read that overlaps such a change is not cached. ``Last-Modified``
+    is the newest update to the window's daily rows, or midnight (UTC) when
+    the window last moved.
+    """
+    check_org_access(current_user, org_id)
+    today = datetime.utcnow().date()
+    # Dated so the window moves at midnight rather than when the entry expires
+    cache_key = f"kpis:{org_id}:7d:{today}"
+    cached = await kpi_cache.get(cache_key)
+    if cached is not MISSING:
+        response.headers["Last-Modified"] = cached["last_modified"]
+        return cached["kpis"]
+    versions = await kpi_cache.tag_versions(f"org:{org_id}")
+
+    week_start = today - timedelta(days=6)
+    rows = await load_org_window(db, org_id, week_start - timedelta(days=7), healthy_since=week_start)
+    if rows is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
 
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    total_employees = rows[0].headcount or 0
+    days = [r for r in rows if r.day is not None]
+    current = [r for r in days if r.day >= week_start]
+    previous = [r for r in days if r.day < week_start]
 
-    q = (
-        select(func.avg(SleepAssessment.score))
-        .join(User, User.id == SleepAssessment.user_id)
-        .where(User.organization_id == org_id)
-        .where(SleepAssessment.type == "PSQI")
-        .where(SleepAssessment.created_at >= seven_days_ago)
-    )
-    result = await db.execute(q)
-    avg_score = result.scalar() or 0
+    def _avg(window) -> float:
+        count = sum(r.score_count for r in window)
+        return sum(r.score_sum for r in window) / count if count else 0
 
-    # Percent employees below healthy threshold (avg PSQI < 10) over 7 days
-    threshold_q = (
-        select(func.count(func.distinct(User.id)))
-        .join(SleepAssessment, SleepAssessment.user_id == User.id)
-        .where(User.organization_id == org_id)
-        .where(SleepAssessment.type == "PSQI")
-        .where(SleepAssessment.created_at >= seven_days_ago)
-        .group_by(User.id)
-        .having(func.avg(SleepAssessment.score) < 10)
-    )
-    threshold_count = len((await db.execute(threshold_q)).all())
+    avg_score = _avg(current)
+    prev_avg = _avg(previous)
 
-    total_emp_q = select(func.count()).select_from(User).where(User.organization_id == org_id)
-    total_employees = (await db.execute(total_emp_q)).scalar() or 0
+    # Percent employees below healthy threshold (avg PSQI < 10) over 7 days
+    threshold_count = rows[0].healthy_users
     pct_healthy = round((threshold_count / total_employees * 100) if total_employees else 0, 2)
 
     # Trend: compare current 7-day avg with previous 7 days
-    prev_start = seven_days_ago - timedelta(days=7)
-    prev_q = (
-        select(func.avg(SleepAssessment.score))
-        .join(User, User.id == SleepAssessment.user_id)
-        .where(User.organization_id == org_id)
-        .where(SleepAssessment.type == "PSQI")
-        .where(SleepAssessment.created_at >= prev_start)
-        .where(SleepAssessment.created_at < seven_days_ago)
-    )
-    prev_avg = (await db.execute(prev_q)).scalar() or 0
     trend_delta = round(avg_score - prev_avg, 2)
 
-    return {
+    kpis = {
         "organization_id": org_id,
         "average_psqi_score_last_7_days": round(avg_score, 2),
         "percent_employees_healthy": pct_healthy,
         "avg_psqi_change_vs_prev_week": trend_delta,
-    } 
\ No newline at end of file
+    }
+    # Both weeks feed the KPIs; the window itself moves at midnight
+    midnight = datetime.combine(today, time(), tzinfo=timezone.utc)
+    last_modified = http_date(max([midnight, *(r.updated_at for r in days if r.updated_at is not None)]))
+    await kpi_cache.set(
+        cache_key,
+        {"kpis": kpis, "last_modified": last_modified},
+        tags=[f"org:{org_id}"],
+        ttl=max_cache_ttl(db),
+        versions=versions,
+    )
+    response.headers["Last-Modified"] = last_modified
+    return kpis
@@ -1,17 +1,23 @@
 from datetime import datetime
-from fastapi import APIRouter
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.db.session import get_db
+from backend.app.services.sleep_summary import get_summary
+from backend.app.api.routes.users import get_current_user, User
 
 router = APIRouter()
 
 
 @router.get("/summary")
-async def daily_sleep_summary():
-    # Placeholder implementation
-    return {
-        "date": datetime.utcnow().date(),
-        "sleep_score": 80,
-        "recommendations": [
-            "Aim for consistent bedtime.",
-            "Reduce caffeine intake after 2 PM.",
-        ],
-    } 
\ No newline at end of file
+async def daily_sleep_summary(
+    response: Response,
+    days: int = Query(30, ge=1, le=90, description="Nights to include, ending today"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Latest nightly sleep score, trend and per-night scores over `days` nights."""
+    summary, last_modified = await get_summary(db, current_user.id, datetime.utcnow().date(), days)
+    response.headers["Last-Modified"] = last_modified
+    return summary
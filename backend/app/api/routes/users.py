@@ -1,39 +1,131 @@
+import hashlib
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.app.core.config import settings
 from backend.app.core.security import decode_access_token
-from backend.app.db.session import get_db
+from backend.app.db.session import AsyncSessionLocal, get_db, get_read_db, max_cache_ttl, read_session
 from backend.app.models.user import User
 from backend.app.schemas.user import UserOut
+from backend.app.services.cache import MISSING, TieredCache
+from backend.app.services.psqi_aggregates import invalidate_org_kpis
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+# Verified principals keyed by token digest; tagged "user:<id>" so role or
+# organization changes can drop every cached token of that user at once.
+principal_cache = TieredCache(
+    "auth",
+    ttl=settings.principal_cache_ttl_seconds,
+    local_ttl=settings.principal_cache_local_ttl_seconds,
+)
+
+PRINCIPAL_FIELDS = ("id", "email", "full_name", "role", "organization_id")
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """Forget cached principals of `user_id`; call after changing role or org."""
+    await principal_cache.invalidate_tags(f"user:{user_id}")
+
+
+def _principal_key(token: str) -> str:
+    return f"token:{hashlib.sha256(token.encode()).hexdigest()}"
+
+
+async def cached_principal(token: str) -> dict | None:
+    """`PRINCIPAL_FIELDS` of an already verified token, or None if not cached."""
+    snapshot = await principal_cache.get(_principal_key(token))
+    return None if snapshot is MISSING else snapshot
+
+
+async def _authenticate(token: str, db: AsyncSession) -> User:
+    """Resolve the bearer token to a user, from the principal cache when possible.
+
+    Cache hits skip both JWT verification and the users lookup and return a
+    detached `User` built from the cached snapshot.
+    """
+    cache_key = _principal_key(token)
+    snapshot = await principal_cache.get(cache_key)
+    if snapshot is not MISSING:
+        return User(**snapshot)
+
     payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     user_id: str = payload.get("sub")
     result = await db.execute(select(User).where(User.id == int(user_id)))
     user = result.scalar_one_or_none()
+    if user is None and db.info.get("replica"):
+        # A user registered moments ago may not have replicated yet
+        async with AsyncSessionLocal() as primary:
+            return await _authenticate(token, primary)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    # Never cache a principal beyond its token's own expiry
+    ttl = int(payload.get("exp", 0) - time.time())
+    replica_ttl = max_cache_ttl(db)
+    if replica_ttl is not None:
+        ttl = min(ttl, replica_ttl)
+    if ttl > 0:
+        snapshot = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+        await principal_cache.set(cache_key, snapshot, tags=[f"user:{user.id}"], ttl=ttl)
     return user
 
 
-# HR role guard
-async def require_hr(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+    return await _authenticate(token, db)
+
+
+async def get_current_user_read(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)) -> User:
+    """`get_current_user` for read-only endpoints; looks the user up on the read replica."""
+    return await _authenticate(token, db)
+
+
+async def get_current_user_stream(token: str = Depends(oauth2_scheme)) -> User:
+    """`get_current_user_read` for streamed responses.
+
+    Session dependencies stay open until a streamed body is fully sent, so
+    this one closes its read session before returning; the stream then holds
+    only its own connection.
+    """
+    async with read_session() as db:
+        return await _authenticate(token, db)
+
+
+def _check_hr(current_user: User) -> User:
     if current_user.role not in {"hr", "admin"}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="HR role required")
     return current_user
 
 
+# HR role guard
+async def require_hr(current_user: User = Depends(get_current_user)) -> User:
+    return _check_hr(current_user)
+
+
+async def require_hr_stream(current_user: User = Depends(get_current_user_stream)) -> User:
+    """`require_hr` for streamed responses; see `get_current_user_stream`."""
+    return _check_hr(current_user)
+
+
+def check_org_access(current_user: User, *org_ids: int) -> None:
+    """403 unless `current_user` is an admin or a member of every org in `org_ids`."""
+    if current_user.role == "admin":
+        return
+    if any(org_id != current_user.organization_id for org_id in org_ids):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a member of this organization")
+
+
 @router.get("/me", response_model=UserOut)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user_read)):
     return current_user 
 
 # Admin endpoint to change user role
@@ -53,4 +145,6 @@ async def update_user_role(user_id: int, role: str, db: AsyncSession = Depends(g
     user.role = role
     await db.commit()
     await db.refresh(user)
+    await invalidate_principal(user.id)
+    await invalidate_org_kpis(user.organization_id)
     return user 
\ No newline at end of file
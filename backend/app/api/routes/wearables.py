@@ -1 +1,3 @@
- 
\ No newline at end of file
+from fastapi import APIRouter
+
+router = APIRouter()
@@ -0,0 +1,185 @@
+"""Admission control for the expensive routes: rate limits and load shedding.
+
+Requests are sorted into route classes (`ROUTE_CLASSES`). Each class has:
+
+* token buckets in Redis, per user and per organization (per client address
+  for login, which is unauthenticated). A request needs a token from every
+  bucket it maps to, else it gets 429 with ``Retry-After`` set to when the
+  emptiest bucket refills. Buckets are checked and drawn from atomically in a
+  Lua script, so concurrent API workers share the limits.
+* a per-process concurrency cap. Requests over the cap get 503 straight
+  away instead of queueing behind a saturated worker, which keeps p99
+  bounded under overload (as `core.security` does for bcrypt).
+
+The organization comes from the principal cache, so the org bucket applies
+once the token has been verified by an earlier request. Redis is
+best-effort: if it is unreachable, requests are admitted and only the
+concurrency caps apply.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+from dataclasses import dataclass
+from typing import Callable
+
+from redis.exceptions import RedisError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from backend.app.api.routes.users import cached_principal
+from backend.app.core.config import settings
+from backend.app.core.metrics import ADMISSION_REJECTED
+from backend.app.core.redis import get_redis
+from backend.app.core.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+# KEYS: bucket keys; ARGV: (rate per second, capacity) per key.
+# Returns 0 and takes one token from every bucket, or returns the seconds
+# until all of them hold a token again and takes nothing.
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tokens, wait = {}, 0
+for i, key in ipairs(KEYS) do
+  local rate, capacity = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local level = tonumber(state[1]) or capacity
+  local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+  tokens[i] = math.min(capacity, level + elapsed * rate)
+  if tokens[i] < 1 then wait = math.max(wait, (1 - tokens[i]) / rate) end
+end
+for i, key in ipairs(KEYS) do
+  local rate, capacity = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+  if wait == 0 then tokens[i] = tokens[i] - 1 end
+  redis.call('HSET', key, 'tokens', tokens[i], 'ts', now)
+  redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return tostring(wait)
+"""
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    matches: Callable[[str, str], bool]  # (method, path)
+    # Requests per minute by bucket scope ("client", "user", "org"); 0 = unlimited
+    limits: Callable[[], dict[str, int]]
+    max_concurrent: Callable[[], int]
+
+
+def _api(path: str) -> str:
+    return f"{settings.api_v1_prefix}{path}"
+
+
+ROUTE_CLASSES = (
+    RouteClass(
+        "login",
+        lambda method, path: method == "POST" and path.rstrip("/") == _api("/auth/login"),
+        lambda: {"client": settings.rate_limit_login_per_minute},
+        lambda: settings.max_concurrent_login,
+    ),
+    RouteClass(
+        # Completions only; history reads are cheap
+        "chat",
+        lambda method, path: method == "POST" and path.startswith(_api("/chat")),
+        lambda: {"user": settings.rate_limit_chat_user_per_minute, "org": settings.rate_limit_chat_org_per_minute},
+        lambda: settings.max_concurrent_chat,
+    ),
+    RouteClass(
+        "export",
+        lambda method, path: path.startswith(_api("/exports")),
+        lambda: {"user": settings.rate_limit_export_user_per_minute, "org": settings.rate_limit_export_org_per_minute},
+        lambda: settings.max_concurrent_export,
+    ),
+)
+
+
+def classify(method: str, path: str) -> RouteClass | None:
+    return next((rc for rc in ROUTE_CLASSES if rc.matches(method, path)), None)
+
+
+async def _identities(scope: Scope) -> dict[str, str]:
+    """Bucket scope -> identity for this request (missing scopes are not limited)."""
+    identities = {}
+    client = scope.get("client")
+    if client:
+        identities["client"] = client[0]
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return identities
+    principal = await cached_principal(token)
+    if principal is not None:
+        identities["user"] = str(principal["id"])
+        if principal.get("organization_id") is not None:
+            identities["org"] = str(principal["organization_id"])
+        return identities
+    payload = decode_access_token(token)
+    if payload and payload.get("sub"):
+        identities["user"] = str(payload["sub"])
+    return identities
+
+
+async def acquire_tokens(route_class: RouteClass, identities: dict[str, str]) -> float:
+    """Take a token from each applicable bucket; returns 0 or seconds to wait."""
+    keys, args = [], []
+    for scope_name, per_minute in route_class.limits().items():
+        if per_minute > 0 and scope_name in identities:
+            keys.append(f"ratelimit:{route_class.name}:{scope_name}:{identities[scope_name]}")
+            args += [per_minute / 60, per_minute]
+    if not keys:
+        return 0.0
+    try:
+        return float(await get_redis().eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args))
+    except RedisError as exc:
+        logger.warning("Rate limiting unavailable, admitting request: %s", exc)
+        return 0.0
+
+
+async def _reject(send: Send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._in_flight: dict[str, int] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = None
+        if scope["type"] == "http" and settings.rate_limit_enabled:
+            route_class = classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class.name
+        cap = route_class.max_concurrent()
+        if cap and self._in_flight.get(name, 0) >= cap:
+            ADMISSION_REJECTED.labels(name, "overloaded").inc()
+            await _reject(send, 503, "Server is busy, retry shortly", 1)
+            return
+        # Counted from here so requests waiting on Redis hold their slot too
+        self._in_flight[name] = self._in_flight.get(name, 0) + 1
+        try:
+            wait = await acquire_tokens(route_class, await _identities(scope))
+            if wait > 0:
+                ADMISSION_REJECTED.labels(name, "rate_limited").inc()
+                await _reject(send, 429, "Rate limit exceeded", wait)
+                return
+            await self.app(scope, receive, send)
+        finally:
+            self._in_flight[name] -= 1
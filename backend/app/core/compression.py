@@ -0,0 +1,125 @@
+"""Brotli / gzip response compression.
+
+Starlette's `GZipMiddleware` would compress the chat SSE stream (holding
+events back in the compressor) and re-compress exports that are already
+gzipped, so this middleware skips both: responses that carry a
+``Content-Encoding`` or are ``text/event-stream`` pass through untouched.
+
+Brotli is preferred when the client accepts it and the ``brotli`` package is
+importable; otherwise gzip. Bodies sent in one piece are compressed only
+above `compression_minimum_size`; streamed bodies are compressed chunk by
+chunk.
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+NEVER_COMPRESS = ("text/event-stream",)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Best supported coding the client accepts (``q=0`` excludes it)."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._impl: Any = brotli.Compressor(quality=settings.compression_brotli_quality)
+            self.compress, self._finish = self._impl.process, self._impl.finish
+        else:
+            # wbits=31 writes the gzip header and trailer
+            self._impl = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+            self.compress, self._finish = self._impl.compress, self._impl.flush
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(NEVER_COMPRESS)
+    )
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = None
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: _Compressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                passthrough = not _compressible(Headers(raw=message["headers"]))
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body and len(body) < settings.compression_minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["Content-Length"]
+                await send(start)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
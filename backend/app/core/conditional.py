@@ -0,0 +1,119 @@
+"""ETag / Last-Modified validators and 304 responses for JSON GETs.
+
+Every successful, non-streamed JSON response to a GET gets a weak ETag (a
+hash of the body) and ``Cache-Control: private, no-cache`` so clients keep
+it and revalidate on each poll; a matching ``If-None-Match`` is answered
+with an empty 304. Handlers mostly answer polls from `TieredCache`, so a
+revalidation costs a cache hit and a hash, and no body goes over the wire.
+
+``Last-Modified`` is left to the routes, which know when their data last
+changed (`http_date` formats it): a time derived here from the body would
+differ between workers and could move backwards, so a body that changed and
+changed back would be answered with a stale 304. ``If-Modified-Since`` is
+only honored when the route set ``Last-Modified``, and only without
+``If-None-Match`` (RFC 9110 13.2.2).
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Headers a 304 repeats from the full response (validators, caching, CORS)
+NOT_MODIFIED_HEADERS = ("cache-control", "etag", "last-modified", "vary", "expires", "access-control-")
+
+
+def make_etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    # Weak comparison: W/"x" matches "x"
+    return tag.strip().removeprefix("W/")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(t) for t in if_none_match.split(",")}
+
+
+def http_date(value: datetime) -> str:
+    """``Last-Modified`` value for `value` (naive means UTC), never later than now."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(min(value.astimezone(timezone.utc), datetime.now(timezone.utc)), usegmt=True)
+
+
+def _parse_http_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _not_modified(self, request: Headers, etag: str, last_modified: str | None) -> bool:
+        if "if-none-match" in request:
+            return etag_matches(request["if-none-match"], etag)
+        since = _parse_http_date(request.get("if-modified-since", ""))
+        modified = _parse_http_date(last_modified)
+        return since is not None and modified is not None and modified <= since
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        request = Headers(scope=scope)
+        start: Message | None = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    message["status"] != 200
+                    or "etag" in headers
+                    or "content-length" not in headers  # streamed
+                    or not headers.get("content-type", "").startswith("application/json")
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start["headers"])
+            etag = make_etag(body)
+            headers["ETag"] = etag
+            if "cache-control" not in headers:
+                headers["Cache-Control"] = "private, no-cache"
+
+            if self._not_modified(request, etag, headers.get("last-modified")):
+                kept = [(k, v) for k, v in start["headers"] if k.decode("latin-1").lower().startswith(NOT_MODIFIED_HEADERS)]
+                await send({"type": "http.response.start", "status": 304, "headers": kept})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,154 @@
+"""Prometheus metrics for the API and the Celery workers.
+
+All metrics live in the default registry and are rendered by `render_metrics`
+(the API's ``/metrics`` route and the worker's metrics server). Under a
+multi-process server (gunicorn / uvicorn workers, Celery prefork) set
+``PROMETHEUS_MULTIPROC_DIR`` to a shared, empty directory so every process's
+samples are aggregated into one scrape.
+
+Label values are bounded: routes are reported by template (``/hr/{org_id}/kpis``),
+SQL by statement verb, and unmatched paths collapse into one label.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TASK_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 900, 1800)
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"])
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response body is sent", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served", ["method", "route"], multiprocess_mode="livesum"
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests turned away by admission control", ["route_class", "reason"]
+)
+
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["engine", "statement"])
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["engine", "statement"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "SQL statements that raised", ["engine", "statement"])
+
+EXTERNAL_LATENCY = Histogram(
+    "external_call_duration_seconds", "Calls to external services (Gemini, Mongo, ...)",
+    ["service", "operation", "outcome"], buckets=LATENCY_BUCKETS,
+)
+
+TASK_LATENCY = Histogram("celery_task_duration_seconds", "Celery task runtime", ["task", "state"], buckets=TASK_BUCKETS)
+TASK_RETRIES = Counter("celery_task_retries_total", "Celery task retries", ["task"])
+WEARABLE_ACCOUNTS = Counter(
+    "wearable_accounts_processed_total", "Wearable accounts handled by ingestion tasks", ["provider", "outcome"]
+)
+WEARABLE_READINGS = Counter("wearable_readings_written_total", "Wearable readings upserted", ["provider"])
+WEARABLE_TOKENS_REFRESHED = Counter("wearable_tokens_refreshed_total", "Wearable OAuth tokens renewed")
+
+SQL_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CREATE", "DROP", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Current samples in the Prometheus text format, with its content type."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+@asynccontextmanager
+async def timed(service: str, operation: str) -> AsyncIterator[None]:
+    """Record the duration of an external call, labelled ok / error."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_LATENCY.labels(service, operation, outcome).observe(time.perf_counter() - started)
+
+
+def _statement_kind(statement: str) -> str:
+    verb = statement.lstrip(" (\n").split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in SQL_VERBS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Time every statement `engine` executes via SQLAlchemy cursor events."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        started = conn.info["query_started"].pop()
+        kind = _statement_kind(statement)
+        DB_QUERIES.labels(name, kind).inc()
+        DB_QUERY_LATENCY.labels(name, kind).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context: Any) -> None:
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+        DB_QUERY_ERRORS.labels(name, _statement_kind(context.statement or "")).inc()
+
+
+def route_template(app: ASGIApp, scope: Scope) -> str:
+    """The path template of the route `scope` will be dispatched to."""
+    for route in getattr(app, "routes", ()):
+        match, child = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Per-route request count, latency (until the last body chunk) and in-flight gauge.
+
+    A plain ASGI middleware rather than `BaseHTTPMiddleware`, so streamed
+    responses (SSE, exports) are timed to completion and not buffered.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        route = route_template(scope["app"], scope)
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, status).inc()
@@ -0,0 +1,67 @@
+"""Opt-in sampling profiler for slow requests.
+
+With ``PROFILER_ENABLED=true``, `profiler_sample_rate` of requests run under
+pyinstrument (a statistical profiler with asyncio support, installed
+separately: ``pip install pyinstrument``). Profiles of sampled requests that
+take at least `profiler_slow_ms` are written as HTML to
+`profiler_output_dir`; the rest are discarded. Overhead is limited to the
+sampled requests.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import re
+import time
+from pathlib import Path
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class SlowRequestProfiler:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("PROFILER_ENABLED is set but pyinstrument is not installed; profiling disabled")
+            Profiler = None
+        self._profiler_cls = Profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or self._profiler_cls is None
+            or random.random() >= settings.profiler_sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self._profiler_cls(interval=settings.profiler_interval_seconds, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= settings.profiler_slow_ms:
+                self._save(profiler, scope, elapsed_ms)
+
+    def _save(self, profiler, scope: Scope, elapsed_ms: float) -> None:
+        out_dir = Path(settings.profiler_output_dir)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}{_UNSAFE.sub('_', scope['path'])}-{elapsed_ms:.0f}ms.html"
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            (out_dir / name).write_text(profiler.output_html())
+        except OSError as exc:
+            logger.warning("Could not write profile %s: %s", name, exc)
+            return
+        logger.info("Slow request %s %s took %.0f ms; profile saved to %s",
+                    scope["method"], scope["path"], elapsed_ms, out_dir / name)
@@ -0,0 +1,13 @@
+from redis.asyncio import Redis
+
+from backend.app.core.config import settings
+
+_client: Redis | None = None
+
+
+def get_redis() -> Redis:
+    """Shared asyncio Redis client (same instance Celery uses as broker)."""
+    global _client
+    if _client is None:
+        _client = Redis.from_url(settings.redis_url)
+    return _client
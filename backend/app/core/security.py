@@ -1,12 +1,16 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from backend.app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with other rounds count as deprecated and are upgraded on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 ALGORITHM = "HS256"
 
 
@@ -18,6 +22,61 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Return (valid, new_hash); new_hash is set when the stored hash is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# --- Off-loop hashing ---
+# bcrypt burns hundreds of ms of CPU per call, so the async helpers below run
+# it in a small process pool instead of on the event loop. Calls beyond
+# `password_hash_max_pending` are rejected immediately rather than queued.
+
+class PasswordHasherBusy(Exception):
+    """Too many password hash operations are already pending."""
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def _run_hashing(fn: Callable[..., Any], *args: Any) -> Any:
+    global _pending
+    if _pending >= settings.password_hash_max_pending:
+        raise PasswordHasherBusy()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_hashing(verify_and_update_password, plain_password, hashed_password)
+
+
+def shutdown_password_hasher() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
 def create_access_token(data: Dict[str, Any], *, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
@@ -0,0 +1,9 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from backend.app.core.config import settings
+
+# Mongo client for chat memory
+mongo_client = AsyncIOMotorClient(settings.mongodb_uri)
+chat_db = mongo_client["sleepfix"]
+messages_col = chat_db["chat_messages"]
+summaries_col = chat_db["chat_summaries"]
@@ -1,9 +1,37 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from backend.app.core.config import settings
+from backend.app.core.metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _create_engine(dsn: str) -> AsyncEngine:
+    return create_async_engine(
+        dsn,
+        echo=False,
+        future=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
 
-engine = create_async_engine(settings.postgres_dsn, echo=False, future=True)
+engine = _create_engine(settings.postgres_dsn)
+# Without a replica DSN reads simply share the primary engine
+read_engine = _create_engine(settings.postgres_replica_dsn) if settings.postgres_replica_dsn else engine
+instrument_engine(engine, "primary")
+if read_engine is not engine:
+    instrument_engine(read_engine, "replica")
 
 AsyncSessionLocal = sessionmaker(
     engine,
@@ -11,7 +39,59 @@ AsyncSessionLocal = sessionmaker(
     class_=AsyncSession,
 )
 
+ReadSessionLocal = sessionmaker(
+    read_engine,
+    expire_on_commit=False,
+    class_=AsyncSession,
+    info={"replica": read_engine is not engine},
+)
+
+# Monotonic time until which reads go to the primary after a replica failure
+_replica_down_until = 0.0
+
+
 async def get_db():
     """FastAPI dependency that provides an async database session per request."""
     async with AsyncSessionLocal() as session:
-        yield session 
\ No newline at end of file
+        yield session
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """Session for read-only work, on the replica when one is configured.
+
+    The replica connection is checked out up front; if that fails the
+    session falls back to the primary and the replica is skipped for
+    `db_replica_retry_seconds`. `session.info["replica"]` tells callers which
+    one they got (replica data may lag the primary slightly).
+    """
+    global _replica_down_until
+    if read_engine is not engine and time.monotonic() >= _replica_down_until:
+        session = ReadSessionLocal()
+        try:
+            await session.connection()
+        except (DBAPIError, OSError) as exc:
+            await session.close()
+            _replica_down_until = time.monotonic() + settings.db_replica_retry_seconds
+            logger.warning("Read replica unavailable, using primary for %ss: %s", settings.db_replica_retry_seconds, exc)
+        else:
+            async with session:
+                yield session
+            return
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def max_cache_ttl(session: AsyncSession) -> int | None:
+    """TTL cap for caching results read through `session` (None: no cap).
+
+    A cache invalidation can race replication lag and re-cache a stale
+    replica read, so such results are only cached briefly.
+    """
+    return settings.db_replica_cache_ttl_seconds if session.info.get("replica") else None
+
+
+async def get_read_db():
+    """FastAPI dependency for read-only endpoints; see `read_session`."""
+    async with read_session() as session:
+        yield session
@@ -1,11 +1,29 @@
-from fastapi import FastAPI
+import logging
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from backend.app.core.admission import AdmissionControlMiddleware
+from backend.app.core.compression import CompressionMiddleware
+from backend.app.core.conditional import ConditionalGetMiddleware
 from backend.app.core.config import settings
+from backend.app.core.metrics import MetricsMiddleware, render_metrics
+from backend.app.core.profiling import SlowRequestProfiler
+from backend.app.core.security import shutdown_password_hasher
+from backend.app.services.chat_memory import ensure_indexes
 from backend.app.api.api import api_router
 
-app = FastAPI(title="SleepFix.ai API", openapi_url=f"{settings.api_v1_prefix}/openapi.json")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="SleepFix.ai API",
+    openapi_url=f"{settings.api_v1_prefix}/openapi.json",
+    default_response_class=ORJSONResponse,
+)
 
+# Innermost of these, so 429/503 rejections still carry CORS headers
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins,
@@ -13,10 +31,37 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# ETags are computed on the uncompressed body, so this sits inside compression
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Added last so it wraps everything, including CORS preflights
+app.add_middleware(MetricsMiddleware)
+if settings.profiler_enabled:
+    app.add_middleware(SlowRequestProfiler)
 
 app.include_router(api_router, prefix=settings.api_v1_prefix)
 
 
+@app.on_event("startup")
+async def _startup():
+    try:
+        await ensure_indexes()
+    except Exception:
+        # Mongo is optional; chat memory degrades to unindexed queries
+        logger.exception("Could not create chat indexes")
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    shutdown_password_hasher()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
 @app.get("/ping")
 async def ping():
     return {"message": "pong"} 
\ No newline at end of file
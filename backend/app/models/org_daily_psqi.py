@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from backend.app.db.base import Base
+
+class OrgDailyPsqi(Base):
+    """Per-organization, per-day PSQI totals maintained on every submission."""
+    __tablename__ = "org_daily_psqi"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    score_sum = Column(Integer, nullable=False, server_default="0")
+    score_count = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class OrgUserDailyPsqi(Base):
+    """Per-employee PSQI totals by day, keyed organization-first.
+
+    Per-employee averages over a window (the "healthy" share) are grouped in
+    SQL from an index range on (organization_id, day); each submission only
+    touches its own small row.
+    """
+    __tablename__ = "org_user_daily_psqi"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    score_sum = Column(Integer, nullable=False, server_default="0")
+    score_count = Column(Integer, nullable=False, server_default="0")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Date, DateTime, ForeignKey, JSON, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -13,6 +13,9 @@ class WearableAccount(Base):
     access_token = Column(String, nullable=False)
     refresh_token = Column(String, nullable=True)
     expires_at = Column(DateTime(timezone=True), nullable=True)
+    # Sync cursor: last provider day fully fetched (NULL until the first backfill)
+    synced_through = Column(Date, nullable=True)
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", backref="wearable_accounts")
@@ -23,12 +26,19 @@ class WearableAccount(Base):
 
 
 class WearableReading(Base):
+    """Raw provider payloads, range-partitioned by month on `day`.
+
+    Partitions are created ahead of time and dropped past the retention
+    horizon by `tasks/rollups.py`; the primary key includes `day` because
+    Postgres requires the partition key in every unique constraint.
+    """
     __tablename__ = "wearable_readings"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     provider = Column(String, nullable=False)
     metric = Column(String, nullable=False)  # e.g., "sleep", "activity"
+    day = Column(Date, primary_key=True)  # provider-local day the reading describes
     timestamp = Column(DateTime(timezone=True), nullable=False)
     data = Column(JSON, nullable=False)
 
@@ -36,4 +46,50 @@ class WearableReading(Base):
 
     __table_args__ = (
         Index("ix_reading_user_metric_ts", "user_id", "metric", "timestamp"),
+        # Natural key: one reading per user/provider/metric/day, used for upserts
+        UniqueConstraint("user_id", "provider", "metric", "day", name="uq_reading_user_provider_metric_day"),
+        {"postgresql_partition_by": "RANGE (day)"},
+    )
+
+
+class WearableDailyRollup(Base):
+    """Normalized per-night sleep metrics rolled up from raw readings."""
+    __tablename__ = "wearable_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    provider = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    duration_minutes = Column(Float, nullable=True)
+    efficiency = Column(Float, nullable=True)  # percent time asleep while in bed
+    deep_minutes = Column(Float, nullable=True)
+    light_minutes = Column(Float, nullable=True)
+    rem_minutes = Column(Float, nullable=True)
+    awake_minutes = Column(Float, nullable=True)
+    latency_minutes = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_daily_rollup_user_day", "user_id", "day"),
+    )
+
+
+class WearableWeeklyRollup(Base):
+    """Weekly averages of `WearableDailyRollup`, keyed by ISO week start (Monday)."""
+    __tablename__ = "wearable_weekly_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    provider = Column(String, primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    nights = Column(Integer, nullable=False)
+    avg_duration_minutes = Column(Float, nullable=True)
+    avg_efficiency = Column(Float, nullable=True)
+    avg_deep_minutes = Column(Float, nullable=True)
+    avg_light_minutes = Column(Float, nullable=True)
+    avg_rem_minutes = Column(Float, nullable=True)
+    avg_awake_minutes = Column(Float, nullable=True)
+    avg_latency_minutes = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_weekly_rollup_user_week", "user_id", "week_start"),
     ) 
\ No newline at end of file
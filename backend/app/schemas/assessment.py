@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List
 
 class AssessmentIn(BaseModel):
     answers: Dict[str, int]
@@ -13,5 +13,17 @@ class AssessmentOut(BaseModel):
     score: int
     recommendation: str
 
-    class Config:
-        orm_mode = True 
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class AssessmentImportOut(BaseModel):
+    total: int
+    imported: int
+    duplicates: int  # already stored for the same user and date, skipped
+    failed: int
+    errors: List[ImportRowError]  # capped; `failed` has the full count
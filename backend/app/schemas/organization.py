@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class OrganizationBase(BaseModel):
     name: str
@@ -7,5 +7,4 @@ class OrganizationBase(BaseModel):
 class OrganizationOut(OrganizationBase):
     id: int
 
-    class Config:
-        orm_mode = True 
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True) 
\ No newline at end of file
@@ -1,13 +1,12 @@
 from typing import Dict
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class SleepAssessmentBase(BaseModel):
     type: str  # e.g., "PSQI"
     answers: Dict[str, int]
     score: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class SleepAssessmentOut(SleepAssessmentBase):
@@ -0,0 +1,205 @@
+"""Cohort analytics over the Parquet snapshots written by `tasks/analytics.py`.
+
+Everything here reads Arrow datasets and computes with NumPy, so reports
+never touch Postgres. Filters on `organization_id` prune hive partitions and
+filters on `day` are pushed down to Parquet row groups. The functions are
+blocking; call them from a thread (see `api/routes/analytics.py`).
+
+Reports are per organization: the users table carries no department, so
+``by_organization`` is the finest cohort available.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from backend.app.core.config import settings
+from backend.app.services.psqi_aggregates import HEALTHY_PSQI_THRESHOLD
+
+CURRENT_POINTER = "CURRENT"
+SNAPSHOT_ID_FORMAT = "%Y%m%dT%H%M%SZ"
+PERCENTILES = (10, 25, 50, 75, 90)
+MAX_PSQI = 21
+DURATION_BANDS_HOURS = (6, 7, 8, 9)  # <6, 6-7, 7-8, 8-9, >=9
+PSQI_COMPARISONS = ("duration_minutes", "efficiency", "latency_minutes")
+
+
+class SnapshotUnavailable(LookupError):
+    """No analytics snapshot has been published yet."""
+
+
+def snapshot_root() -> Path:
+    return Path(settings.analytics_snapshot_dir)
+
+
+def snapshot_created_at(snapshot_id: str) -> dt.datetime:
+    """When the export of `snapshot_id` started (ids are UTC timestamps)."""
+    return dt.datetime.strptime(snapshot_id, SNAPSHOT_ID_FORMAT).replace(tzinfo=dt.timezone.utc)
+
+
+_lock = threading.Lock()
+_datasets: tuple[str, dict[str, ds.Dataset]] | None = None
+
+
+def current_snapshot() -> tuple[str, dict[str, ds.Dataset]]:
+    """Return (snapshot_id, datasets by table) for the published snapshot.
+
+    Dataset handles (file listings and Parquet footers) are reused until the
+    CURRENT pointer moves to a newer snapshot.
+    """
+    global _datasets
+    root = snapshot_root()
+    try:
+        snapshot_id = (root / CURRENT_POINTER).read_text().strip()
+    except FileNotFoundError:
+        raise SnapshotUnavailable("No analytics snapshot has been exported yet")
+    with _lock:
+        if _datasets is None or _datasets[0] != snapshot_id:
+            base = root / snapshot_id
+            try:
+                _datasets = (snapshot_id, {
+                    "assessments": ds.dataset(base / "assessments", format="parquet", partitioning="hive"),
+                    "wearable_daily": ds.dataset(base / "wearable_daily", format="parquet", partitioning="hive"),
+                    "users": ds.dataset(base / "users", format="parquet"),
+                })
+            except FileNotFoundError:
+                # Snapshots from before empty tables were written as empty files
+                raise SnapshotUnavailable(f"Analytics snapshot {snapshot_id} is incomplete; wait for the next export")
+        return _datasets
+
+
+def _filter(org_ids: list[int] | None, start: dt.date | None, end: dt.date | None) -> pc.Expression | None:
+    conditions = []
+    if org_ids:
+        conditions.append(ds.field("organization_id").isin(org_ids))
+    if start is not None:
+        conditions.append(ds.field("day") >= start)
+    if end is not None:
+        conditions.append(ds.field("day") <= end)
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    return expr
+
+
+def _read(dataset: ds.Dataset, columns: list[str], expr: pc.Expression | None) -> dict[str, np.ndarray]:
+    table = dataset.to_table(columns=columns, filter=expr)
+    return {c: table[c].to_numpy(zero_copy_only=False) for c in columns}
+
+
+def _group_slices(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(unique keys, sort order, start offsets) for splitting arrays by key."""
+    order = np.argsort(keys, kind="stable")
+    unique, starts = np.unique(keys[order], return_index=True)
+    return unique, order, starts
+
+
+def _group_mean(keys: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Mean of `values` per key, ignoring NaNs (NaN where a key has none)."""
+    valid = ~np.isnan(values)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=len(unique))
+    counts = np.bincount(inverse, weights=valid.astype(float), minlength=len(unique))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return unique, np.where(counts > 0, sums / counts, np.nan)
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Average ranks (ties share the mean of their positions)."""
+    unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    upper = np.cumsum(counts)
+    return (upper - (counts - 1) / 2)[inverse]
+
+
+def _correlation(x: np.ndarray, y: np.ndarray) -> float | None:
+    if len(x) < 3 or np.std(x) == 0 or np.std(y) == 0:
+        return None
+    return round(float(np.corrcoef(x, y)[0, 1]), 4)
+
+
+def _score_stats(scores: np.ndarray) -> dict[str, Any]:
+    if not len(scores):
+        return {"assessments": 0}
+    percentiles = np.percentile(scores, PERCENTILES)
+    return {
+        "assessments": int(len(scores)),
+        "mean": round(float(scores.mean()), 2),
+        "std": round(float(scores.std()), 2),
+        "percentiles": {f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)},
+        "histogram": np.bincount(scores, minlength=MAX_PSQI + 1).tolist(),
+        "healthy_share": round(float((scores < HEALTHY_PSQI_THRESHOLD).mean() * 100), 2),
+    }
+
+
+def psqi_distribution(
+    org_ids: list[int] | None = None, start: dt.date | None = None, end: dt.date | None = None
+) -> dict[str, Any]:
+    """PSQI percentiles, 0-21 histogram and healthy share, overall and per org."""
+    snapshot_id, datasets = current_snapshot()
+    data = _read(datasets["assessments"], ["organization_id", "score"], _filter(org_ids, start, end))
+    scores = data["score"].astype(np.int64)
+    orgs = data["organization_id"]
+    known = ~np.isnan(orgs.astype(float))
+
+    by_org = []
+    if known.any():
+        unique, order, starts = _group_slices(orgs[known].astype(np.int64))
+        for org_id, group in zip(unique, np.split(scores[known][order], starts[1:])):
+            by_org.append({"organization_id": int(org_id), **_score_stats(group)})
+    return {"snapshot": snapshot_id, "overall": _score_stats(scores), "by_organization": by_org}
+
+
+def psqi_sleep_correlation(
+    org_ids: list[int] | None = None, start: dt.date | None = None, end: dt.date | None = None
+) -> dict[str, Any]:
+    """Correlate each user's mean PSQI with their mean wearable sleep metrics.
+
+    Users need both assessments and wearable nights in the window. Reports
+    Pearson and Spearman coefficients per metric (PSQI is "lower is better",
+    so healthy sleep shows up as negative correlations with duration and
+    efficiency) and the mean PSQI per nightly-duration band.
+    """
+    snapshot_id, datasets = current_snapshot()
+    expr = _filter(org_ids, start, end)
+    assessments = _read(datasets["assessments"], ["user_id", "score"], expr)
+    nights = _read(datasets["wearable_daily"], ["user_id", *PSQI_COMPARISONS], expr)
+
+    psqi_users, psqi_means = _group_mean(assessments["user_id"], assessments["score"].astype(float))
+    metrics = {}
+    for metric in PSQI_COMPARISONS:
+        metric_users, metric_means = _group_mean(nights["user_id"], nights[metric].astype(float))
+        _, psqi_idx, metric_idx = np.intersect1d(psqi_users, metric_users, assume_unique=True, return_indices=True)
+        x, y = psqi_means[psqi_idx], metric_means[metric_idx]
+        present = ~np.isnan(y)
+        metrics[metric] = (x[present], y[present])
+
+    correlations = {
+        metric: {
+            "users": int(len(x)),
+            "pearson": _correlation(x, y),
+            "spearman": _correlation(_ranks(x), _ranks(y)) if len(x) else None,
+        }
+        for metric, (x, y) in metrics.items()
+    }
+
+    psqi, minutes = metrics["duration_minutes"]
+    band = np.digitize(minutes / 60, DURATION_BANDS_HOURS)
+    counts = np.bincount(band, minlength=len(DURATION_BANDS_HOURS) + 1)
+    sums = np.bincount(band, weights=psqi, minlength=len(DURATION_BANDS_HOURS) + 1)
+    edges = (None, *DURATION_BANDS_HOURS, None)
+    bands = [
+        {
+            "min_hours": edges[i],
+            "max_hours": edges[i + 1],
+            "users": int(counts[i]),
+            "mean_psqi": round(float(sums[i] / counts[i]), 2) if counts[i] else None,
+        }
+        for i in range(len(counts))
+    ]
+    return {"snapshot": snapshot_id, "correlations": correlations, "psqi_by_sleep_duration": bands}
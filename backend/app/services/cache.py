@@ -0,0 +1,230 @@
+"""Two-tier result cache: a short in-process LRU in front of shared Redis.
+
+The local tier absorbs bursts of identical requests within one process; the
+Redis tier (`settings.redis_url`) is shared by every API worker. Entries can
+carry tags (e.g. ``org:42``) and `invalidate_tags` drops every entry with a
+tag from Redis and from this process's LRU. Other processes keep their local
+copy for at most `local_ttl` seconds, which bounds staleness after a write.
+
+A read that started before an invalidation must not be cached afterwards:
+callers take `tag_versions` before querying and pass them to `set`, which
+then stores nothing if any of the tags was invalidated in between.
+
+Redis is best-effort: if it is unreachable the cache degrades to local-only
+and callers fall through to the database on a miss.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+
+from redis.exceptions import RedisError
+
+from backend.app.core.config import settings
+from backend.app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+# KEYS: value key, then a version key and a tag set key per tag.
+# ARGV: value, ttl, tag set ttl, cache key, then the expected version per tag
+# ("" for none). Stores the value and tags only if no version has moved.
+SET_IF_UNCHANGED_SCRIPT = """
+local n = (#KEYS - 1) / 2
+for i = 1, n do
+  if (redis.call('GET', KEYS[1 + i]) or '') ~= ARGV[4 + i] then return 0 end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 1, n do
+  redis.call('SADD', KEYS[1 + n + i], ARGV[4])
+  redis.call('EXPIRE', KEYS[1 + n + i], ARGV[3])
+end
+return 1
+"""
+
+
+class LocalTTLCache:
+    """Bounded LRU whose entries also expire after `ttl` seconds.
+
+    `on_evict(key)` is called whenever an entry leaves the cache, whether it
+    expired, was pushed out by `maxsize` or was deleted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Callable[[str], None] | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def _evicted(self, key: str) -> None:
+        if self.on_evict is not None:
+            self.on_evict(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return MISSING
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            self._evicted(key)
+            return MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._evicted(evicted)
+
+    def delete(self, key: str) -> None:
+        if self._data.pop(key, None) is not None:
+            self._evicted(key)
+
+
+class TieredCache:
+    """Namespaced JSON cache backed by a `LocalTTLCache` and, optionally, Redis."""
+
+    def __init__(self, namespace: str, *, ttl: int, local_ttl: float, use_redis: bool = True):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.use_redis = use_redis
+        # Without Redis the local tier is the only copy, so it keeps the full TTL
+        self.local = LocalTTLCache(settings.cache_local_maxsize, local_ttl if use_redis else ttl, self._untag)
+        # tag -> local keys and back; entries leave both as they leave the LRU,
+        # so the index never outgrows `cache_local_maxsize` keys
+        self._local_tags: dict[str, set[str]] = {}
+        self._key_tags: dict[str, set[str]] = {}
+        # Bumped by every local invalidation; see `tag_versions`
+        self._generation = 0
+
+    def _untag(self, key: str) -> None:
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._local_tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._local_tags[tag]
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}:tag:{tag}"
+
+    def _version_key(self, tag: str) -> str:
+        return f"{self.namespace}:tagver:{tag}"
+
+    async def tag_versions(self, *tags: str) -> tuple[int, list[str] | None]:
+        """Current versions of `tags`, to take before a read and pass to `set`.
+
+        Redis versions are bumped by `invalidate_tags` in any process; this
+        process's own invalidations are covered by a local generation.
+        """
+        if not self.use_redis or not tags:
+            return self._generation, []
+        try:
+            versions = await get_redis().mget(*(self._version_key(t) for t in tags))
+        except RedisError as exc:
+            logger.warning("Cache version read failed in %s: %s", self.namespace, exc)
+            return self._generation, None
+        return self._generation, [v.decode() if v is not None else "" for v in versions]
+
+    async def get(self, key: str) -> Any:
+        """Return the cached value or `MISSING`."""
+        value = self.local.get(key)
+        if value is not MISSING or not self.use_redis:
+            return value
+        try:
+            raw = await get_redis().get(self._key(key))
+        except RedisError as exc:
+            logger.warning("Cache read failed for %s: %s", self._key(key), exc)
+            return MISSING
+        if raw is None:
+            return MISSING
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        *,
+        tags: Iterable[str] = (),
+        ttl: int | None = None,
+        versions: tuple[int, list[str] | None] | None = None,
+    ) -> None:
+        """Store `value`; `ttl` shortens (never extends) the cache's default TTL.
+
+        With `versions` (from `tag_versions(*tags)`, same tag order) nothing is
+        stored if any tag was invalidated since they were taken.
+        """
+        tags = list(tags)
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if versions is not None and versions[0] != self._generation:
+            return
+        if self.use_redis:
+            try:
+                if versions is None:
+                    pipe = get_redis().pipeline(transaction=False)
+                    pipe.set(self._key(key), json.dumps(value, default=str), ex=ttl)
+                    for tag in tags:
+                        pipe.sadd(self._tag_key(tag), key)
+                        pipe.expire(self._tag_key(tag), self.ttl)
+                    await pipe.execute()
+                elif versions[1] is not None:
+                    keys = [self._key(key), *map(self._version_key, tags), *map(self._tag_key, tags)]
+                    args = [json.dumps(value, default=str), ttl, self.ttl, key, *versions[1]]
+                    if not int(await get_redis().eval(SET_IF_UNCHANGED_SCRIPT, len(keys), *keys, *args)):
+                        return
+            except RedisError as exc:
+                logger.warning("Cache write failed for %s: %s", self._key(key), exc)
+        self._untag(key)
+        self.local.set(key, value, min(ttl, self.local.ttl))
+        if tags and key in self.local:
+            self._key_tags[key] = set(tags)
+            for tag in tags:
+                self._local_tags.setdefault(tag, set()).add(key)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.local.delete(key)
+        if not self.use_redis or not keys:
+            return
+        try:
+            await get_redis().delete(*(self._key(k) for k in keys))
+        except RedisError as exc:
+            logger.warning("Cache delete failed in %s: %s", self.namespace, exc)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        """Drop every entry stored with any of `tags` and bump their versions."""
+        self._generation += 1
+        for tag in tags:
+            for key in self._local_tags.pop(tag, ()):
+                self.local.delete(key)
+        if not self.use_redis:
+            return
+        try:
+            redis = get_redis()
+            for tag in tags:
+                # Before the entries go, so a read racing this cannot re-store one
+                pipe = redis.pipeline(transaction=False)
+                pipe.incr(self._version_key(tag))
+                pipe.expire(self._version_key(tag), self.ttl)
+                await pipe.execute()
+                members = [m.decode() for m in await redis.smembers(self._tag_key(tag))]
+                for key in members:
+                    self.local.delete(key)
+                await redis.delete(self._tag_key(tag), *(self._key(k) for k in members))
+        except RedisError as exc:
+            logger.warning("Cache invalidation failed in %s: %s", self.namespace, exc)
@@ -0,0 +1,83 @@
+"""Response cache for repeated chat prompts.
+
+Most `/chat/` traffic is the same few sleep-hygiene questions. A reply is
+cached under the normalized prompt plus a fingerprint of everything else
+that shapes the completion (model, prompt template version, and the
+conversation memory that went into the prompt), so changing any of them
+never serves a stale or foreign answer.
+
+Since every exchange is stored, nearly every signed-in user has memory, and
+a context-keyed entry only repeats for the same user in the same state.
+Generic questions (`is_generic`: no first-person or back-references such as
+"my" or "that") are therefore answered without memory and keyed on the
+prompt alone, so they are shared by everyone.
+
+The backend is `settings.chat_cache_backend`: ``"redis"`` shares entries
+across API workers, ``"memory"`` keeps them in a per-process LRU.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+
+from backend.app.core.config import settings
+from backend.app.services.cache import MISSING, TieredCache
+from backend.app.services.chat_memory import ConversationContext
+
+# Bump when the prompt built around the user's message changes
+PROMPT_VERSION = 1
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!.]+$")
+
+response_cache = TieredCache(
+    "chat",
+    ttl=settings.chat_cache_ttl_seconds,
+    local_ttl=settings.chat_cache_local_ttl_seconds,
+    use_redis=settings.chat_cache_backend == "redis",
+)
+
+
+def normalize_prompt(message: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a prompt."""
+    return _TRAILING.sub("", _WHITESPACE.sub(" ", message.strip().lower()))
+
+
+# Words that tie a prompt to the asker or to earlier turns
+_PERSONAL = re.compile(
+    r"\b(i|i'm|im|i've|ive|i'd|me|my|mine|myself|we|our|us|it|its|that|this|those|these|"
+    r"above|again|also|more|else|yesterday|tonight|today|last)\b"
+)
+
+
+def is_generic(message: str) -> bool:
+    """True for prompts whose answer cannot depend on who asks or what came before."""
+    return _PERSONAL.search(normalize_prompt(message)) is None
+
+
+def context_fingerprint(context: ConversationContext | None) -> str:
+    """Digest of the memory that goes into the prompt ("" when there is none)."""
+    if context is None or context.is_empty:
+        return ""
+    parts = [context.summary, *(f"{t['user_message']}\n{t['assistant_response']}" for t in context.turns)]
+    return hashlib.sha256("\x1e".join(parts).encode()).hexdigest()
+
+
+def cache_key(message: str, context: ConversationContext | None = None) -> str:
+    fingerprint = f"{settings.gemini_model}:v{PROMPT_VERSION}:{context_fingerprint(context)}"
+    digest = hashlib.sha256(f"{fingerprint}\n{normalize_prompt(message)}".encode()).hexdigest()
+    return f"reply:{digest}"
+
+
+def is_cacheable(message: str) -> bool:
+    return 0 < len(message) <= settings.chat_cache_max_prompt_chars
+
+
+async def get_reply(key: str) -> str | None:
+    value = await response_cache.get(key)
+    return None if value is MISSING else value
+
+
+async def store_reply(key: str, reply: str) -> None:
+    if reply:
+        await response_cache.set(key, reply)
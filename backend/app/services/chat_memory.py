@@ -0,0 +1,144 @@
+"""Windowed conversation memory over the Mongo chat transcript.
+
+A prompt is built from three parts whose size is bounded regardless of how
+long a user's history is:
+
+* a rolling summary of older turns (one doc per user in `chat_summaries`),
+* the most recent turns that fit `chat_memory_token_budget`,
+* the new message.
+
+Once enough turns have piled up behind the window, `maybe_summarize` folds
+them into the summary. All reads go through the compound indexes created by
+`ensure_indexes`.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from backend.app.core.config import settings
+from backend.app.db.mongo import messages_col, summaries_col
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a user's conversation with a sleep coach.\n"
+    "Current summary:\n{previous}\n\n"
+    "New exchanges:\n{transcript}\n\n"
+    "Rewrite the summary in under 200 words, keeping facts about the user's "
+    "sleep habits, goals, and advice already given."
+)
+
+
+@dataclass
+class ConversationContext:
+    summary: str = ""
+    turns: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.summary and not self.turns
+
+
+async def ensure_indexes() -> None:
+    """Create the indexes memory and history queries rely on (idempotent)."""
+    await messages_col.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
+    await messages_col.create_index([("user_id", ASCENDING), ("_id", DESCENDING)])
+    await summaries_col.create_index("user_id", unique=True)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _format_turns(turns: list[dict[str, Any]]) -> str:
+    return "\n".join(f"User: {t['user_message']}\nAssistant: {t['assistant_response']}" for t in turns)
+
+
+async def load_context(user_id: int) -> ConversationContext:
+    """Summary plus the newest turns that fit the token budget, oldest first."""
+    state = await summaries_col.find_one({"user_id": user_id})
+    cursor = (
+        messages_col.find({"user_id": user_id}, {"user_message": 1, "assistant_response": 1})
+        .sort("_id", DESCENDING)
+        .limit(settings.chat_memory_max_turns)
+    )
+    budget = settings.chat_memory_token_budget
+    turns: list[dict[str, Any]] = []
+    async for turn in cursor:
+        cost = estimate_tokens(turn["user_message"]) + estimate_tokens(turn["assistant_response"])
+        if cost > budget:
+            break
+        budget -= cost
+        turns.append(turn)
+    turns.reverse()
+    return ConversationContext(summary=(state or {}).get("summary", ""), turns=turns)
+
+
+def build_prompt(context: ConversationContext, message: str) -> str:
+    if context.is_empty:
+        return message
+    parts = []
+    if context.summary:
+        parts.append(f"Summary of earlier conversation:\n{context.summary}")
+    if context.turns:
+        parts.append(f"Recent conversation:\n{_format_turns(context.turns)}")
+    parts.append(f"User: {message}\nAssistant:")
+    return "\n\n".join(parts)
+
+
+async def maybe_summarize(user_id: int, summarize: Callable[[str], Awaitable[str]]) -> None:
+    """Fold turns older than the recent window into the rolling summary.
+
+    Runs only once `chat_summary_batch_turns` turns have accumulated behind
+    the window, so the LLM is called once per batch, not per message.
+    """
+    state = await summaries_col.find_one({"user_id": user_id}) or {}
+    query: dict[str, Any] = {"user_id": user_id}
+    if state.get("through_id"):
+        query["_id"] = {"$gt": state["through_id"]}
+    pending = await messages_col.count_documents(query)
+    overflow = pending - settings.chat_memory_max_turns
+    if overflow < settings.chat_summary_batch_turns:
+        return
+
+    older = await messages_col.find(query).sort("_id", ASCENDING).limit(overflow).to_list(length=overflow)
+    prompt = SUMMARY_PROMPT.format(previous=state.get("summary") or "(none)", transcript=_format_turns(older))
+    try:
+        summary = await summarize(prompt)
+    except Exception:
+        logger.exception("Summarizing chat history failed for user %s", user_id)
+        return
+    await summaries_col.update_one(
+        {"user_id": user_id},
+        {"$set": {"summary": summary, "through_id": older[-1]["_id"], "updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+async def history_page(user_id: int, cursor: str | None, limit: int) -> tuple[list[dict[str, Any]], str | None]:
+    """One page of a user's turns, newest first, keyed by message id.
+
+    Returns (items, next_cursor); pass next_cursor back to get older turns.
+    """
+    query: dict[str, Any] = {"user_id": user_id}
+    if cursor:
+        query["_id"] = {"$lt": ObjectId(cursor)}
+    docs = await messages_col.find(query).sort("_id", DESCENDING).limit(limit + 1).to_list(length=limit + 1)
+    items = [
+        {
+            "id": str(doc["_id"]),
+            "timestamp": doc["timestamp"],
+            "user_message": doc["user_message"],
+            "assistant_response": doc["assistant_response"],
+        }
+        for doc in docs[:limit]
+    ]
+    next_cursor = items[-1]["id"] if len(docs) > limit else None
+    return items, next_cursor
@@ -0,0 +1,123 @@
+"""Streaming data exports (NDJSON or CSV, optionally gzipped).
+
+Rows are read through a server-side cursor `settings.export_batch_size` at a
+time and encoded batch by batch, so an export of years of wearable JSON uses
+the same memory as one of a single week: at most one batch of rows plus the
+compressor's window is held at any point.
+"""
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+from backend.app.core.config import settings
+from backend.app.db.session import read_session
+from backend.app.models.sleep_assessment import SleepAssessment
+from backend.app.models.user import User
+from backend.app.models.wearable import WearableDailyRollup, WearableReading
+from backend.app.services.sleep_metrics import SLEEP_FIELDS
+
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def user_assessments_query(user_id: int) -> Select:
+    return (
+        select(SleepAssessment.id, SleepAssessment.type, SleepAssessment.score,
+               SleepAssessment.answers, SleepAssessment.created_at)
+        .where(SleepAssessment.user_id == user_id)
+        .order_by(SleepAssessment.id)
+    )
+
+
+def user_readings_query(user_id: int, start: dt.date | None, end: dt.date | None) -> Select:
+    stmt = (
+        select(WearableReading.provider, WearableReading.metric, WearableReading.day,
+               WearableReading.timestamp, WearableReading.data)
+        .where(WearableReading.user_id == user_id)
+        .order_by(WearableReading.day, WearableReading.provider, WearableReading.metric)
+    )
+    return _day_range(stmt, WearableReading.day, start, end)
+
+
+def org_assessments_query(org_id: int) -> Select:
+    return (
+        select(SleepAssessment.user_id, SleepAssessment.type, SleepAssessment.score,
+               SleepAssessment.answers, SleepAssessment.created_at)
+        .join(User, User.id == SleepAssessment.user_id)
+        .where(User.organization_id == org_id)
+        .order_by(SleepAssessment.id)
+    )
+
+
+def org_sleep_query(org_id: int, start: dt.date | None, end: dt.date | None) -> Select:
+    """Normalized nightly metrics of an org's members (raw payloads stay per-user)."""
+    rollup = WearableDailyRollup
+    stmt = (
+        select(rollup.user_id, rollup.provider, rollup.day, *(getattr(rollup, f) for f in SLEEP_FIELDS))
+        .join(User, User.id == rollup.user_id)
+        .where(User.organization_id == org_id)
+        .order_by(rollup.day, rollup.user_id, rollup.provider)
+    )
+    return _day_range(stmt, rollup.day, start, end)
+
+
+def _day_range(stmt: Select, column: Any, start: dt.date | None, end: dt.date | None) -> Select:
+    if start is not None:
+        stmt = stmt.where(column >= start)
+    if end is not None:
+        stmt = stmt.where(column <= end)
+    return stmt
+
+
+async def _batches(stmt: Select) -> AsyncIterator[Sequence[Any]]:
+    # The session is owned by the generator, not the request, so it lives
+    # exactly as long as the response body is being sent.
+    async with read_session() as session:
+        result = await session.stream(stmt.execution_options(yield_per=settings.export_batch_size))
+        async for batch in result.partitions():
+            yield batch
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+async def encode_rows(stmt: Select, fmt: str) -> AsyncIterator[bytes]:
+    """Yield `stmt`'s rows encoded as NDJSON or CSV, one chunk per batch."""
+    columns = [c.key for c in stmt.selected_columns]
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+    async for batch in _batches(stmt):
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_cell(v) for v in row] for row in batch)
+            yield buffer.getvalue().encode()
+        else:
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), default=str, separators=(",", ":")) + "\n" for row in batch
+            ).encode()
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a byte stream incrementally (one compressor for the whole body)."""
+    compressor = zlib.compressobj(settings.export_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        # Sync-flush per batch so the client keeps receiving data on slow exports
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
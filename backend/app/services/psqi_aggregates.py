@@ -0,0 +1,230 @@
+"""Incrementally maintained org/day PSQI aggregates backing the HR KPIs."""
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any
+
+from sqlalchemy import Date, Select, and_, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.core.config import settings
+from backend.app.models.org_daily_psqi import OrgDailyPsqi, OrgUserDailyPsqi
+from backend.app.models.organization import Organization
+from backend.app.models.sleep_assessment import SleepAssessment
+from backend.app.models.user import User
+from backend.app.services.cache import TieredCache
+
+# Day an assessment counts towards, in the database session's time zone; every
+# aggregate path must bucket with this same expression
+ASSESSMENT_DAY = cast(SleepAssessment.created_at, Date)
+
+HEALTHY_PSQI_THRESHOLD = 10  # per-employee average below this counts as healthy
+
+TIMESERIES_GRANULARITIES = ("day", "week", "month")
+
+# HR KPI results, tagged "org:<id>" so any write affecting an org can drop them
+kpi_cache = TieredCache("hr", ttl=settings.hr_cache_ttl_seconds, local_ttl=settings.hr_cache_local_ttl_seconds)
+
+
+async def invalidate_org_kpis(*org_ids: int | None) -> None:
+    """Drop cached KPIs of every org in `org_ids` (None entries are ignored)."""
+    tags = [f"org:{org_id}" for org_id in set(org_ids) if org_id is not None]
+    if tags:
+        await kpi_cache.invalidate_tags(*tags)
+
+
+async def record_assessments(session: AsyncSession, assessment_ids: list[int]) -> None:
+    """Add stored PSQI assessments to their org's and employee's daily rows (caller commits).
+
+    The day comes from the stored ``created_at`` (`ASSESSMENT_DAY`), exactly as
+    `refresh_org_daily_psqi` buckets it, so both paths book an assessment to
+    the same day. Assessments of users without an organization are skipped.
+    """
+    if not assessment_ids:
+        return
+    await _upsert_totals(session, _per_user_totals().where(SleepAssessment.id.in_(assessment_ids)), add=True)
+
+
+def _per_user_totals() -> Select:
+    """PSQI score totals per (organization, day, user) from `sleep_assessments`."""
+    return (
+        select(
+            User.organization_id.label("organization_id"),
+            ASSESSMENT_DAY.label("day"),
+            User.id.label("user_id"),
+            func.sum(SleepAssessment.score).label("score_sum"),
+            func.count().label("score_count"),
+        )
+        .join(User, User.id == SleepAssessment.user_id)
+        .where(SleepAssessment.type == "PSQI")
+        .where(User.organization_id.is_not(None))
+        .group_by(User.organization_id, ASSESSMENT_DAY, User.id)
+    )
+
+
+async def _upsert_totals(session: AsyncSession, per_user: Select, *, add: bool) -> None:
+    """Write `per_user` totals to the org/day/user and org/day rows.
+
+    With `add` the totals are added to existing rows (they cover new
+    assessments only); otherwise they replace them (a full recount).
+    """
+    sub = per_user.subquery()
+    for model, keys in (
+        (OrgUserDailyPsqi, ["organization_id", "day", "user_id"]),
+        (OrgDailyPsqi, ["organization_id", "day"]),
+    ):
+        columns = [sub.c[k] for k in keys]
+        source = select(*columns, func.sum(sub.c.score_sum), func.sum(sub.c.score_count)).group_by(*columns)
+        stmt = pg_insert(model).from_select([*keys, "score_sum", "score_count"], source)
+        set_ = {
+            c: getattr(model, c) + stmt.excluded[c] if add else stmt.excluded[c]
+            for c in ("score_sum", "score_count")
+        }
+        if model is OrgDailyPsqi:
+            set_["updated_at"] = func.now()
+        await session.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_))
+
+
+async def load_org_window(
+    session: AsyncSession, org_id: int, start: dt.date, healthy_since: dt.date
+) -> list[Any] | None:
+    """Fetch the org's headcount, healthy headcount and daily rows since `start` in one query.
+
+    Returns None when the organization does not exist; otherwise rows of
+    (headcount, healthy_users, day, score_sum, score_count, updated_at), with a single
+    all-NULL daily row when nothing was submitted in the window.
+    `healthy_users` counts employees whose average PSQI since
+    `healthy_since` is below `HEALTHY_PSQI_THRESHOLD`.
+    """
+    headcount = (
+        select(func.count())
+        .select_from(User)
+        .where(User.organization_id == Organization.id)
+        .scalar_subquery()
+        .label("headcount")
+    )
+    healthy = (
+        select(OrgUserDailyPsqi.user_id)
+        .where(OrgUserDailyPsqi.organization_id == org_id)
+        .where(OrgUserDailyPsqi.day >= healthy_since)
+        .group_by(OrgUserDailyPsqi.user_id)
+        # avg < threshold, kept in integers
+        .having(func.sum(OrgUserDailyPsqi.score_sum) < HEALTHY_PSQI_THRESHOLD * func.sum(OrgUserDailyPsqi.score_count))
+        .subquery()
+    )
+    healthy_users = select(func.count()).select_from(healthy).scalar_subquery().label("healthy_users")
+    q = (
+        select(
+            headcount,
+            healthy_users,
+            OrgDailyPsqi.day,
+            OrgDailyPsqi.score_sum,
+            OrgDailyPsqi.score_count,
+            OrgDailyPsqi.updated_at,
+        )
+        .select_from(Organization)
+        .outerjoin(OrgDailyPsqi, and_(OrgDailyPsqi.organization_id == Organization.id, OrgDailyPsqi.day >= start))
+        .where(Organization.id == org_id)
+    )
+    rows = (await session.execute(q)).all()
+    return rows or None
+
+
+async def load_org_timeseries(
+    session: AsyncSession, org_ids: list[int], start: dt.date, end: dt.date, granularity: str
+) -> list[Any]:
+    """Per-org, per-bucket PSQI stats for [start, end] in one statement.
+
+    Per-user averages are grouped per bucket, folded into org/bucket rows
+    alongside the headcount, and `lag()` over each org's buckets yields the
+    period-over-period change.
+    """
+    if granularity not in TIMESERIES_GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    # Inlined (not bound) so the select list and GROUP BY share one expression
+    bucket = func.date_trunc(literal_column(f"'{granularity}'"), SleepAssessment.created_at)
+    per_user = (
+        select(
+            User.organization_id.label("org_id"),
+            bucket.label("bucket"),
+            (func.sum(SleepAssessment.score) * 1.0 / func.count()).label("user_avg"),
+            func.sum(SleepAssessment.score).label("score_sum"),
+            func.count().label("score_count"),
+        )
+        .join(User, User.id == SleepAssessment.user_id)
+        .where(User.organization_id.in_(org_ids))
+        .where(SleepAssessment.type == "PSQI")
+        .where(SleepAssessment.created_at >= start)
+        .where(SleepAssessment.created_at < end + dt.timedelta(days=1))
+        .group_by(User.organization_id, bucket, User.id)
+        .subquery()
+    )
+    headcount = (
+        select(User.organization_id.label("org_id"), func.count().label("headcount"))
+        .where(User.organization_id.in_(org_ids))
+        .group_by(User.organization_id)
+        .subquery()
+    )
+    per_bucket = (
+        select(
+            per_user.c.org_id,
+            per_user.c.bucket,
+            (func.sum(per_user.c.score_sum) * 1.0 / func.sum(per_user.c.score_count)).label("avg_psqi"),
+            (
+                100.0 * func.count().filter(per_user.c.user_avg < HEALTHY_PSQI_THRESHOLD)
+                / func.nullif(func.max(headcount.c.headcount), 0)
+            ).label("healthy_share"),
+            func.count().label("active_users"),
+        )
+        .join(headcount, headcount.c.org_id == per_user.c.org_id)
+        .group_by(per_user.c.org_id, per_user.c.bucket)
+        .subquery()
+    )
+    window = {"partition_by": per_bucket.c.org_id, "order_by": per_bucket.c.bucket}
+    q = select(
+        per_bucket,
+        (per_bucket.c.avg_psqi - func.lag(per_bucket.c.avg_psqi).over(**window)).label("avg_psqi_change"),
+        (per_bucket.c.healthy_share - func.lag(per_bucket.c.healthy_share).over(**window)).label("healthy_share_change"),
+    ).order_by(per_bucket.c.org_id, per_bucket.c.bucket)
+    return (await session.execute(q)).all()
+
+
+async def refresh_org_daily_psqi(
+    session: AsyncSession,
+    *,
+    org_ids: list[int] | None = None,
+    start: dt.date | None = None,
+    end: dt.date | None = None,
+) -> None:
+    """Recompute org/day and org/day/user rows from `sleep_assessments` (caller commits).
+
+    Optionally limited to `org_ids` and to days in [start, end]; rows
+    outside the filters are left untouched.
+    """
+    per_user = _per_user_totals()
+    if org_ids is not None:
+        per_user = per_user.where(User.organization_id.in_(org_ids))
+    if start is not None:
+        per_user = per_user.where(ASSESSMENT_DAY >= start)
+    if end is not None:
+        per_user = per_user.where(ASSESSMENT_DAY <= end)
+    await _upsert_totals(session, per_user, add=False)
+
+
+async def rebuild_org_daily_psqi(session: AsyncSession) -> None:
+    """Recompute every org/day row from `sleep_assessments` (backfill/repair)."""
+    await refresh_org_daily_psqi(session)
+    await session.commit()
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    from backend.app.db.session import AsyncSessionLocal
+
+    async def _main() -> None:
+        async with AsyncSessionLocal() as session:
+            await rebuild_org_daily_psqi(session)
+
+    asyncio.run(_main())
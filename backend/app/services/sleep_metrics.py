@@ -0,0 +1,95 @@
+"""Normalize provider sleep payloads into one flat set of nightly metrics.
+
+Raw `WearableReading.data` keeps each provider's own JSON shape (see
+`tasks/wearables.py`): Fitbit days hold ``{"sleep": [log, ...]}`` and Oura
+days hold ``{"data": [period, ...]}``. Everything downstream (rollups,
+scoring, analytics) works on the fields in `SLEEP_FIELDS` instead.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+SLEEP_FIELDS = (
+    "duration_minutes",
+    "efficiency",
+    "deep_minutes",
+    "light_minutes",
+    "rem_minutes",
+    "awake_minutes",
+    "latency_minutes",
+)
+
+SleepMetrics = dict[str, float | None]
+
+
+def _weighted(values: list[tuple[float | None, float]]) -> float | None:
+    """Average of (value, weight) pairs ignoring missing values."""
+    pairs = [(v, w) for v, w in values if v is not None]
+    total = sum(w for _, w in pairs)
+    if not pairs or total <= 0:
+        return None
+    return sum(v * w for v, w in pairs) / total
+
+
+def _sum(values: list[float | None]) -> float | None:
+    present = [v for v in values if v is not None]
+    return float(sum(present)) if present else None
+
+
+def _fitbit_stage(log: dict[str, Any], *names: str) -> float | None:
+    summary = (log.get("levels") or {}).get("summary") or {}
+    minutes = [summary[n]["minutes"] for n in names if n in summary]
+    return float(sum(minutes)) if minutes else None
+
+
+def _normalize_fitbit(data: dict[str, Any]) -> SleepMetrics | None:
+    logs = data.get("sleep") or []
+    if not logs:
+        return None
+    main = next((log for log in logs if log.get("isMainSleep")), logs[0])
+    durations = [float(log.get("minutesAsleep", 0)) for log in logs]
+    return {
+        "duration_minutes": sum(durations),
+        "efficiency": _weighted([(log.get("efficiency"), d) for log, d in zip(logs, durations)]),
+        "deep_minutes": _sum([_fitbit_stage(log, "deep") for log in logs]),
+        "light_minutes": _sum([_fitbit_stage(log, "light") for log in logs]),
+        "rem_minutes": _sum([_fitbit_stage(log, "rem") for log in logs]),
+        # "classic" logs report awake + restless instead of a wake stage
+        "awake_minutes": _sum([_fitbit_stage(log, "wake", "awake", "restless") for log in logs]),
+        "latency_minutes": main.get("minutesToFallAsleep"),
+    }
+
+
+def _minutes(seconds: Any) -> float | None:
+    return None if seconds is None else float(seconds) / 60
+
+
+def _normalize_oura(data: dict[str, Any]) -> SleepMetrics | None:
+    periods = data.get("data") or []
+    if not periods:
+        return None
+    main = next((p for p in periods if p.get("type") == "long_sleep"), periods[0])
+    durations = [_minutes(p.get("total_sleep_duration")) or 0.0 for p in periods]
+    return {
+        "duration_minutes": sum(durations),
+        "efficiency": _weighted([(p.get("efficiency"), d) for p, d in zip(periods, durations)]),
+        "deep_minutes": _sum([_minutes(p.get("deep_sleep_duration")) for p in periods]),
+        "light_minutes": _sum([_minutes(p.get("light_sleep_duration")) for p in periods]),
+        "rem_minutes": _sum([_minutes(p.get("rem_sleep_duration")) for p in periods]),
+        "awake_minutes": _sum([_minutes(p.get("awake_time")) for p in periods]),
+        "latency_minutes": _minutes(main.get("latency")),
+    }
+
+
+NORMALIZERS = {
+    "fitbit": _normalize_fitbit,
+    "oura": _normalize_oura,
+}
+
+
+def normalize_sleep(provider: str, data: Any) -> SleepMetrics | None:
+    """Return `SLEEP_FIELDS` for one provider day, or None if it holds no sleep."""
+    normalizer = NORMALIZERS.get(provider)
+    if normalizer is None or not isinstance(data, dict):
+        return None
+    return normalizer(data)
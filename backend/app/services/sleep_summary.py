@@ -0,0 +1,203 @@
+"""Daily sleep scores and trends computed from a user's wearable readings.
+
+Readings are normalized with `sleep_metrics.normalize_sleep` into a
+(nights x `SLEEP_FIELDS`) float matrix, NaN where a provider did not report
+a value, and a whole window is scored in one pass of array arithmetic.
+Results are memoized per user and window in `summary_cache` and dropped by
+`invalidate_user_summaries` when ingestion writes new sleep readings.
+
+Score components (each 0..1, combined with `WEIGHTS` over the components
+present for a night, then scaled to 0..100):
+
+* duration    full marks for 7-9 h, zero at 4 h or 12 h
+* efficiency  zero at 65 %, full marks from 90 %
+* restorative deep + REM share of sleep, full marks from 40 %
+* latency     full marks up to 15 min, zero from 60 min
+"""
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.core.conditional import http_date
+from backend.app.core.config import settings
+from backend.app.models.wearable import WearableReading
+from backend.app.services.cache import MISSING, TieredCache
+from backend.app.services.sleep_metrics import SLEEP_FIELDS, normalize_sleep
+
+COMPONENTS = ("duration", "efficiency", "restorative", "latency")
+WEIGHTS = np.array([0.4, 0.25, 0.2, 0.15])
+TREND_WINDOW_DAYS = 7
+STABLE_SLOPE_PER_WEEK = 1.0
+
+_FIELD = {name: i for i, name in enumerate(SLEEP_FIELDS)}
+
+RECOMMENDATIONS = {
+    "duration": "Aim for 7-9 hours of sleep; keep a consistent bedtime.",
+    "efficiency": "Reserve your bed for sleep and get up if you lie awake for long.",
+    "restorative": "Avoid alcohol and heavy meals late in the evening to protect deep and REM sleep.",
+    "latency": "Wind down without screens for 30 minutes and reduce caffeine after 2 PM.",
+}
+DEFAULT_RECOMMENDATIONS = [
+    "Aim for consistent bedtime.",
+    "Reduce caffeine intake after 2 PM.",
+]
+
+summary_cache = TieredCache(
+    "sleep",
+    ttl=settings.sleep_summary_cache_ttl_seconds,
+    local_ttl=settings.sleep_summary_local_ttl_seconds,
+)
+
+
+async def invalidate_user_summaries(*user_ids: int) -> None:
+    """Drop memoized summaries of `user_ids`; call after storing their sleep readings."""
+    if user_ids:
+        await summary_cache.invalidate_tags(*(f"user:{uid}" for uid in user_ids))
+
+
+async def load_nights(
+    session: AsyncSession, user_id: int, start: dt.date, end: dt.date
+) -> tuple[np.ndarray, dt.datetime | None]:
+    """Metrics matrix for the nights in [start, end], one row per day, and the newest reading's timestamp.
+
+    Days without readings are all-NaN rows. When several providers report
+    the same night the longest recorded sleep wins.
+    """
+    matrix = np.full(((end - start).days + 1, len(SLEEP_FIELDS)), np.nan)
+    newest = None
+    rows = await session.execute(
+        select(WearableReading.provider, WearableReading.day, WearableReading.timestamp, WearableReading.data)
+        .where(WearableReading.user_id == user_id)
+        .where(WearableReading.metric == "sleep")
+        .where(WearableReading.day >= start)
+        .where(WearableReading.day <= end)
+    )
+    duration = _FIELD["duration_minutes"]
+    for provider, day, timestamp, data in rows:
+        newest = timestamp if newest is None else max(newest, timestamp)
+        metrics = normalize_sleep(provider, data)
+        if metrics is None:
+            continue
+        values = np.array([np.nan if metrics[f] is None else metrics[f] for f in SLEEP_FIELDS], dtype=float)
+        row = matrix[(day - start).days]
+        if np.isnan(row[duration]) or values[duration] > row[duration]:
+            matrix[(day - start).days] = values
+    return matrix, newest
+
+
+def score_components(matrix: np.ndarray) -> np.ndarray:
+    """(nights x `COMPONENTS`) sub-scores in 0..1, NaN where inputs are missing."""
+    minutes = matrix[:, _FIELD["duration_minutes"]]
+    hours = minutes / 60
+    duration = 1 - np.clip(7 - hours, 0, None) / 3 - np.clip(hours - 9, 0, None) / 3
+    efficiency = (matrix[:, _FIELD["efficiency"]] - 65) / 25
+    with np.errstate(divide="ignore", invalid="ignore"):
+        restorative = (matrix[:, _FIELD["deep_minutes"]] + matrix[:, _FIELD["rem_minutes"]]) / minutes / 0.4
+    latency = 1 - (matrix[:, _FIELD["latency_minutes"]] - 15) / 45
+    components = np.column_stack([duration, efficiency, restorative, latency])
+    components[~np.isfinite(components)] = np.nan
+    return np.clip(components, 0, 1)
+
+
+def score_nights(matrix: np.ndarray) -> np.ndarray:
+    """0..100 score per night; NaN for nights without a recorded duration."""
+    components = score_components(matrix)
+    present = ~np.isnan(components)
+    weights = np.where(present, WEIGHTS, 0.0)
+    total = weights.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        scores = 100 * np.nansum(components * WEIGHTS, axis=1) / total
+    scores[np.isnan(matrix[:, _FIELD["duration_minutes"]]) | (total == 0)] = np.nan
+    return scores
+
+
+def rolling_mean(values: np.ndarray, window: int = TREND_WINDOW_DAYS) -> np.ndarray:
+    """Trailing mean over `window` days ignoring NaNs (NaN if the window is empty)."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0))
+    counts = np.cumsum(valid)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def trend_slope(scores: np.ndarray) -> float | None:
+    """Least-squares slope of the nightly scores, in points per week."""
+    days = np.flatnonzero(~np.isnan(scores))
+    if len(days) < 2:
+        return None
+    slope, _ = np.polyfit(days, scores[days], 1)
+    return float(slope * 7)
+
+
+def _num(value: float, digits: int = 1) -> float | None:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _recommendations(matrix: np.ndarray) -> list[str]:
+    components = score_components(matrix)
+    if np.isnan(components).all():
+        return DEFAULT_RECOMMENDATIONS
+    with np.errstate(invalid="ignore"):
+        means = np.nanmean(components, axis=0)
+    weakest = [COMPONENTS[i] for i in np.argsort(np.nan_to_num(means, nan=1.0)) if means[i] < 0.8]
+    return [RECOMMENDATIONS[c] for c in weakest[:2]] or ["Keep up your current sleep routine."]
+
+
+def summarize(matrix: np.ndarray, start: dt.date) -> dict[str, Any]:
+    """JSON-ready summary of a nights matrix whose first row is `start`."""
+    scores = score_nights(matrix)
+    rolling = rolling_mean(scores)
+    scored = np.flatnonzero(~np.isnan(scores))
+    slope = trend_slope(scores)
+    if slope is None:
+        direction = None
+    elif abs(slope) < STABLE_SLOPE_PER_WEEK:
+        direction = "stable"
+    else:
+        direction = "improving" if slope > 0 else "declining"
+
+    nights = [
+        {
+            "date": start + dt.timedelta(days=int(i)),
+            "score": _num(scores[i]),
+            "rolling_score": _num(rolling[i]),
+            **{f: _num(matrix[i, j]) for j, f in enumerate(SLEEP_FIELDS)},
+        }
+        for i in scored
+    ]
+    return {
+        "sleep_score": _num(scores[scored[-1]]) if len(scored) else None,
+        "average_score": _num(np.nanmean(scores)) if len(scored) else None,
+        "nights_recorded": len(scored),
+        "trend": {"slope_per_week": None if slope is None else round(slope, 2), "direction": direction},
+        "nights": nights,
+        "recommendations": _recommendations(matrix),
+    }
+
+
+async def get_summary(session: AsyncSession, user_id: int, end: dt.date, days: int) -> tuple[dict[str, Any], str]:
+    """Memoized summary of the `days` nights ending on `end`, and its ``Last-Modified``.
+
+    That is the newest reading's timestamp, but not before midnight of `end`
+    (UTC), when the window last moved.
+    """
+    key = f"summary:{user_id}:{end.isoformat()}:{days}"
+    cached = await summary_cache.get(key)
+    if cached is not MISSING:
+        return cached["summary"], cached["last_modified"]
+    start = end - dt.timedelta(days=days - 1)
+    matrix, newest = await load_nights(session, user_id, start, end)
+    summary = {"date": end, "days": days, **summarize(matrix, start)}
+    modified = dt.datetime.combine(end, dt.time(), tzinfo=dt.timezone.utc)
+    if newest is not None:
+        modified = max(modified, newest)
+    last_modified = http_date(modified)
+    await summary_cache.set(key, {"summary": summary, "last_modified": last_modified}, tags=[f"user:{user_id}"])
+    return summary, last_modified
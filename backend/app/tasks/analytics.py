@@ -0,0 +1,163 @@
+"""Columnar analytics snapshots exported from Postgres.
+
+A beat task copies the tables the analytics reports need into Parquet
+under `settings.analytics_snapshot_dir`, so percentile, histogram and
+correlation queries (`services/analytics.py`) run on Arrow/NumPy instead of
+the OLTP database. Each run writes a new snapshot directory:
+
+    <snapshot_dir>/<snapshot_id>/assessments/organization_id=<id>/*.parquet
+    <snapshot_dir>/<snapshot_id>/wearable_daily/organization_id=<id>/*.parquet
+    <snapshot_dir>/<snapshot_id>/users/*.parquet
+
+and then atomically repoints `<snapshot_dir>/CURRENT` at it, so readers
+never see a half-written snapshot. Users are exported as id, organization
+and role only; no names or e-mail addresses leave Postgres.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import Date, cast, select
+from sqlalchemy.sql import Select
+
+from backend.app.api.routes.assessments import PSQI_COMPONENT_KEYS
+from backend.app.core.config import settings
+from backend.app.db.session import read_session
+from backend.app.models.sleep_assessment import SleepAssessment
+from backend.app.models.user import User
+from backend.app.models.wearable import WearableDailyRollup
+from backend.app.services.analytics import CURRENT_POINTER, SNAPSHOT_ID_FORMAT, snapshot_root
+from backend.app.services.sleep_metrics import SLEEP_FIELDS
+from backend.app.tasks import runtime
+from backend.app.tasks.wearables import celery_app
+
+logger = logging.getLogger(__name__)
+
+PARTITIONING = ds.partitioning(pa.schema([("organization_id", pa.int32())]), flavor="hive")
+
+ASSESSMENTS_SCHEMA = pa.schema(
+    [("user_id", pa.int32()), ("organization_id", pa.int32()), ("day", pa.date32()), ("score", pa.int8())]
+    + [(k, pa.int8()) for k in PSQI_COMPONENT_KEYS]
+)
+WEARABLE_DAILY_SCHEMA = pa.schema(
+    [("user_id", pa.int32()), ("organization_id", pa.int32()), ("provider", pa.string()), ("day", pa.date32())]
+    + [(f, pa.float32()) for f in SLEEP_FIELDS]
+)
+USERS_SCHEMA = pa.schema([("user_id", pa.int32()), ("organization_id", pa.int32()), ("role", pa.string())])
+
+
+async def _fetch_table(stmt: Select, schema: pa.Schema) -> pa.Table:
+    """Stream `stmt` through a server-side cursor into an Arrow table.
+
+    Rows are converted to columnar batches as they arrive, so peak memory is
+    the Arrow table itself rather than a list of Row objects.
+    """
+    batches = []
+    async with read_session() as session:
+        result = await session.stream(stmt.execution_options(yield_per=settings.analytics_export_batch_size))
+        async for rows in result.partitions():
+            columns = list(zip(*rows))
+            batches.append(pa.record_batch([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema))
+    return pa.Table.from_batches(batches, schema=schema)
+
+
+def _assessments_query(since: dt.date) -> Select:
+    day = cast(SleepAssessment.created_at, Date)
+    return (
+        select(
+            SleepAssessment.user_id,
+            User.organization_id,
+            day,
+            SleepAssessment.score,
+            *(SleepAssessment.answers[k].as_integer() for k in PSQI_COMPONENT_KEYS),
+        )
+        .join(User, User.id == SleepAssessment.user_id)
+        .where(SleepAssessment.type == "PSQI")
+        .where(SleepAssessment.created_at >= since)
+        .order_by(User.organization_id, day)
+    )
+
+
+def _wearable_daily_query(since: dt.date) -> Select:
+    rollup = WearableDailyRollup
+    return (
+        select(
+            rollup.user_id,
+            User.organization_id,
+            rollup.provider,
+            rollup.day,
+            *(getattr(rollup, f) for f in SLEEP_FIELDS),
+        )
+        .join(User, User.id == rollup.user_id)
+        .where(rollup.day >= since)
+        .order_by(User.organization_id, rollup.day)
+    )
+
+
+def _write(table: pa.Table, path: Path, partitioned: bool) -> None:
+    if table.num_rows == 0:
+        # write_dataset creates nothing for an empty table, and readers need
+        # the directory and schema (e.g. before any wearable rollups exist)
+        path.mkdir(parents=True)
+        pq.write_table(table, path / "part-0.parquet")
+        return
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=PARTITIONING if partitioned else None,
+        max_rows_per_file=settings.analytics_max_rows_per_file,
+        max_rows_per_group=min(settings.analytics_max_rows_per_file, 128 * 1024),
+        existing_data_behavior="error",
+    )
+
+
+def _publish(root: Path, snapshot_id: str) -> None:
+    """Point CURRENT at `snapshot_id` atomically and prune old snapshots."""
+    tmp = root / f".{CURRENT_POINTER}.tmp"
+    tmp.write_text(snapshot_id)
+    os.replace(tmp, root / CURRENT_POINTER)
+    snapshots = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in snapshots[:-settings.analytics_snapshots_keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+async def export_snapshot() -> dict[str, Any]:
+    """Write a full snapshot and publish it; returns its id and row counts."""
+    since = dt.datetime.utcnow().date() - dt.timedelta(days=settings.analytics_snapshot_days)
+    snapshot_id = dt.datetime.utcnow().strftime(SNAPSHOT_ID_FORMAT)
+    root = snapshot_root()
+    staging = root / f".{snapshot_id}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    tables = {
+        "assessments": (await _fetch_table(_assessments_query(since), ASSESSMENTS_SCHEMA), True),
+        "wearable_daily": (await _fetch_table(_wearable_daily_query(since), WEARABLE_DAILY_SCHEMA), True),
+        "users": (await _fetch_table(select(User.id, User.organization_id, User.role), USERS_SCHEMA), False),
+    }
+    try:
+        for name, (table, partitioned) in tables.items():
+            _write(table, staging / name, partitioned)
+        staging.rename(root / snapshot_id)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _publish(root, snapshot_id)
+    return {"snapshot": snapshot_id, **{name: table.num_rows for name, (table, _) in tables.items()}}
+
+
+@celery_app.task(name="analytics.export_snapshot")
+def export_analytics_snapshot() -> dict[str, Any]:
+    """Export assessments, users and daily wearable metrics to Parquet."""
+    stats = runtime.run(export_snapshot())
+    logger.info("Published analytics snapshot %s", stats)
+    return stats
@@ -0,0 +1,161 @@
+"""Shared HTTP plumbing for wearable ingestion.
+
+Each provider gets one pooled HTTP/2 client and a client-side rate limiter;
+`fan_out` runs a per-account coroutine across all accounts with a bounded
+number in flight.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+import httpx
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    name: str
+    base_url: str
+    requests_per_second: float
+
+
+PROVIDERS: dict[str, ProviderSpec] = {
+    "fitbit": ProviderSpec("fitbit", "https://api.fitbit.com", settings.fitbit_requests_per_second),
+    "oura": ProviderSpec("oura", "https://api.ouraring.com", settings.oura_requests_per_second),
+    "google_fit": ProviderSpec("google_fit", "https://www.googleapis.com", settings.google_fit_requests_per_second),
+}
+
+
+class RateLimiter:
+    """Token bucket shared by every request sent to one provider."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_delay(response: httpx.Response | None, attempt: int) -> float:
+    """Backoff before the next attempt, capped at `wearable_http_max_retry_delay_seconds`."""
+    delay = float(2 ** attempt)
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+    return min(delay, settings.wearable_http_max_retry_delay_seconds)
+
+
+class ProviderClient:
+    """Pooled, rate-limited HTTP client for a single wearable provider.
+
+    `transport` replaces the network (e.g. `benchmarks/simulator.py`); the
+    rate limiter and retry policy still apply.
+    """
+
+    def __init__(self, provider: str, transport: httpx.AsyncBaseTransport | None = None):
+        self.spec = PROVIDERS[provider]
+        self.limiter = RateLimiter(self.spec.requests_per_second)
+        self.http = httpx.AsyncClient(
+            base_url=self.spec.base_url,
+            transport=transport,
+            http2=True,
+            timeout=settings.wearable_http_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.wearable_http_max_connections,
+                max_keepalive_connections=settings.wearable_http_max_connections,
+            ),
+        )
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        before_send: Callable[[], Awaitable[None]] | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send a request, retrying 429/5xx and transport errors with backoff.
+
+        `before_send` is awaited right before every attempt goes out (e.g. to
+        extend a lock); if it raises, the request is abandoned unsent.
+        """
+        max_retries = settings.wearable_http_max_retries
+        for attempt in range(max_retries + 1):
+            await self.limiter.acquire()
+            if before_send is not None:
+                await before_send()
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt == max_retries:
+                    raise
+                await asyncio.sleep(_retry_delay(None, attempt))
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt < max_retries:
+                    await asyncio.sleep(_retry_delay(response, attempt))
+                    continue
+            return response
+        raise AssertionError("unreachable")
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    async def __aenter__(self) -> "ProviderClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+
+async def fan_out(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    *,
+    concurrency: int | None = None,
+) -> list[R | None]:
+    """Run `worker` over `items` with at most `concurrency` calls in flight.
+
+    A failing item is logged and yields ``None`` so one bad account does not
+    abort the whole cycle. Results keep the order of `items`.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.wearable_ingest_concurrency)
+
+    async def _one(item: T) -> R | None:
+        async with semaphore:
+            try:
+                return await worker(item)
+            except Exception:
+                logger.exception("Ingestion failed for %r", item)
+                return None
+
+    return await asyncio.gather(*(_one(item) for item in items))
@@ -0,0 +1,58 @@
+"""Celery task metrics (see `core/metrics.py`).
+
+Task durations and retries are recorded from Celery signals in whichever
+process runs the task. With ``WORKER_METRICS_PORT`` set, the worker's main
+process serves them for Prometheus; under the default prefork pool also set
+``PROMETHEUS_MULTIPROC_DIR`` so the children's samples are aggregated.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any
+
+from celery.signals import task_postrun, task_prerun, task_retry, worker_init, worker_process_shutdown
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+from backend.app.core.config import settings
+from backend.app.core.metrics import TASK_LATENCY, TASK_RETRIES
+
+logger = logging.getLogger(__name__)
+
+_started: dict[str, float] = {}
+
+
+@task_prerun.connect
+def _task_started(task_id: str, task: Any, **_: Any) -> None:
+    _started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_finished(task_id: str, task: Any, state: str | None = None, **_: Any) -> None:
+    started = _started.pop(task_id, None)
+    if started is not None:
+        TASK_LATENCY.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+@task_retry.connect
+def _task_retried(sender: Any = None, **_: Any) -> None:
+    TASK_RETRIES.labels(getattr(sender, "name", "unknown")).inc()
+
+
+@worker_init.connect
+def _serve_metrics(**_: Any) -> None:
+    if not settings.worker_metrics_port:
+        return
+    registry = None
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(settings.worker_metrics_port, **({"registry": registry} if registry else {}))
+    logger.info("Serving worker metrics on :%d", settings.worker_metrics_port)
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(pid: int | None = None, **_: Any) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,218 @@
+"""Partition upkeep, retention and rollups for `wearable_readings`.
+
+Raw readings live in monthly range partitions on `day`. Two beat tasks keep
+them bounded:
+
+* ``wearables.rollup_readings`` (hourly) normalizes recently ingested raw
+  payloads into `wearable_daily_rollups` and recomputes the affected rows of
+  `wearable_weekly_rollups`, so long-range queries read the small rollups.
+* ``wearables.manage_partitions`` (daily) creates partitions ahead of
+  ingestion and drops raw partitions older than `wearable_raw_retention_days`,
+  rolling each one up in full right before it is dropped.
+
+The partitions ingestion needs right away are also created when a worker
+starts, so a fresh database does not wait a day for the first
+``manage_partitions`` run.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import re
+from collections import defaultdict
+from typing import Any
+
+from celery.signals import worker_ready
+from sqlalchemy import Date, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.core.config import settings
+from backend.app.db.session import AsyncSessionLocal, engine
+from backend.app.models.wearable import WearableDailyRollup, WearableReading, WearableWeeklyRollup
+from backend.app.services.sleep_metrics import SLEEP_FIELDS, normalize_sleep
+from backend.app.tasks import runtime
+from backend.app.tasks.wearables import celery_app
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = "wearable_readings_y{year:04d}m{month:02d}"
+PARTITION_RE = re.compile(r"^wearable_readings_y(\d{4})m(\d{2})$")
+
+
+def _next_month(month: dt.date) -> dt.date:
+    return (month.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+
+
+def _week_start(day: dt.date) -> dt.date:
+    return day - dt.timedelta(days=day.weekday())
+
+
+async def ensure_partitions(session: AsyncSession, start: dt.date, end: dt.date) -> None:
+    """Create the monthly partitions covering [start, end] if missing."""
+    month = start.replace(day=1)
+    while month <= end:
+        upper = _next_month(month)
+        name = PARTITION_NAME.format(year=month.year, month=month.month)
+        await session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF wearable_readings "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        month = upper
+    await session.commit()
+
+
+async def _existing_partitions(session: AsyncSession) -> list[tuple[str, dt.date]]:
+    """(name, first day) of every attached partition, oldest first."""
+    names = (await session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'wearable_readings'"
+    ))).scalars().all()
+    partitions = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, dt.date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def _upsert_daily(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    chunk_size = settings.wearable_upsert_chunk_size
+    for start in range(0, len(rows), chunk_size):
+        stmt = pg_insert(WearableDailyRollup).values(rows[start:start + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "provider", "day"],
+            set_={**{f: stmt.excluded[f] for f in SLEEP_FIELDS}, "updated_at": func.now()},
+        )
+        await session.execute(stmt)
+    await session.commit()
+
+
+async def _refresh_weekly(session: AsyncSession, weeks: dict[dt.date, set[int]]) -> None:
+    """Recompute weekly averages for the given week -> user ids from daily rollups."""
+    daily = WearableDailyRollup
+    for week_start, user_ids in weeks.items():
+        averages = [func.avg(getattr(daily, f)) for f in SLEEP_FIELDS]
+        source = (
+            select(daily.user_id, daily.provider, literal(week_start, Date), func.count(), *averages)
+            .where(daily.user_id.in_(user_ids))
+            .where(daily.day >= week_start)
+            .where(daily.day < week_start + dt.timedelta(days=7))
+            .group_by(daily.user_id, daily.provider)
+        )
+        avg_columns = [f"avg_{f}" for f in SLEEP_FIELDS]
+        stmt = pg_insert(WearableWeeklyRollup).from_select(
+            ["user_id", "provider", "week_start", "nights", *avg_columns], source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "provider", "week_start"],
+            set_={**{c: stmt.excluded[c] for c in ["nights", *avg_columns]}, "updated_at": func.now()},
+        )
+        await session.execute(stmt)
+    await session.commit()
+
+
+async def rollup_readings(
+    *,
+    ingested_since: dt.datetime | None = None,
+    day_from: dt.date | None = None,
+    day_to: dt.date | None = None,
+) -> int:
+    """Normalize matching raw sleep readings into daily and weekly rollups.
+
+    Raw rows are streamed through a server-side cursor so memory stays flat
+    however many readings match. Returns the number of days rolled up.
+    """
+    stmt = select(
+        WearableReading.user_id, WearableReading.provider, WearableReading.day, WearableReading.data
+    ).where(WearableReading.metric == "sleep")
+    if ingested_since is not None:
+        stmt = stmt.where(WearableReading.timestamp >= ingested_since)
+    if day_from is not None:
+        stmt = stmt.where(WearableReading.day >= day_from)
+    if day_to is not None:
+        stmt = stmt.where(WearableReading.day < day_to)
+
+    weeks: dict[dt.date, set[int]] = defaultdict(set)
+    rolled = 0
+    async with AsyncSessionLocal() as read_session, AsyncSessionLocal() as write_session:
+        result = await read_session.stream(stmt.execution_options(yield_per=settings.wearable_upsert_chunk_size))
+        async for batch in result.partitions():
+            rows = []
+            for user_id, provider, day, data in batch:
+                metrics = normalize_sleep(provider, data)
+                if metrics is None:
+                    continue
+                rows.append({"user_id": user_id, "provider": provider, "day": day, **metrics})
+                weeks[_week_start(day)].add(user_id)
+            await _upsert_daily(write_session, rows)
+            rolled += len(rows)
+        await _refresh_weekly(write_session, weeks)
+    return rolled
+
+
+def _ingestion_window(today: dt.date) -> tuple[dt.date, dt.date]:
+    """Days ingestion may write: the backfill window plus the months ahead."""
+    return (
+        today - dt.timedelta(days=settings.wearable_backfill_max_days),
+        today + dt.timedelta(days=31 * settings.wearable_partitions_ahead_months),
+    )
+
+
+async def _manage_partitions() -> list[str]:
+    today = dt.datetime.utcnow().date()
+    # Never expire data the ingestion backfill may still write into
+    horizon_days = max(settings.wearable_raw_retention_days, settings.wearable_backfill_max_days + 31)
+    cutoff = today - dt.timedelta(days=horizon_days)
+
+    dropped = []
+    async with AsyncSessionLocal() as session:
+        await ensure_partitions(session, *_ingestion_window(today))
+        for name, lower in await _existing_partitions(session):
+            upper = _next_month(lower)
+            if upper > cutoff:
+                break
+            await rollup_readings(day_from=lower, day_to=upper)
+            await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            await session.commit()
+            dropped.append(name)
+    if dropped:
+        logger.info("Dropped expired wearable_readings partitions: %s", ", ".join(dropped))
+    return dropped
+
+
+async def _ensure_ingestion_partitions() -> None:
+    try:
+        async with AsyncSessionLocal() as session:
+            await ensure_partitions(session, *_ingestion_window(dt.datetime.utcnow().date()))
+    finally:
+        # This runs on a throwaway loop; don't leave connections bound to it
+        await engine.dispose()
+
+
+@worker_ready.connect
+def _create_partitions_on_startup(**_: Any) -> None:
+    try:
+        asyncio.run(_ensure_ingestion_partitions())
+    except Exception:
+        logger.exception("Could not create wearable_readings partitions at worker startup")
+
+
+@celery_app.task(name="wearables.rollup_readings")
+def rollup_recent_readings() -> int:
+    """Roll up raw sleep readings ingested within the lookback window."""
+    since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=settings.wearable_rollup_lookback_hours)
+    # Bounding `day` as well lets Postgres prune partitions outside the backfill window
+    earliest = since.date() - dt.timedelta(days=settings.wearable_backfill_max_days)
+    rolled = runtime.run(rollup_readings(ingested_since=since, day_from=earliest))
+    logger.info("Rolled up %d wearable days", rolled)
+    return rolled
+
+
+@celery_app.task(name="wearables.manage_partitions")
+def manage_partitions() -> list[str]:
+    """Create upcoming monthly partitions and drop expired ones."""
+    return runtime.run(_manage_partitions())
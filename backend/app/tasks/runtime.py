@@ -0,0 +1,101 @@
+"""Long-lived asyncio runtime for Celery worker processes.
+
+`asyncio.run` per task builds a fresh event loop each time, which strands the
+asyncpg pool behind `AsyncSessionLocal` (its connections are bound to the
+loop that opened them) and forces every task to reconnect. Instead each
+worker process keeps one loop for its whole life and task bodies run on it
+via `run`, so the SQLAlchemy pool and the provider HTTP clients stay warm
+between tasks.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable, Coroutine, TypeVar
+
+import httpx
+
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from backend.app.db.session import engine, read_engine
+from backend.app.tasks.ingestion import ProviderClient
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_clients: dict[str, ProviderClient] = {}
+_transport_factory: Callable[[str], httpx.AsyncBaseTransport] | None = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide loop, creating it on first use.
+
+    Lazy creation also covers pools that never fire `worker_process_init`
+    (``--pool=solo``, eager mode, scripts).
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run an async task body to completion on the persistent loop."""
+    return get_loop().run_until_complete(coro)
+
+
+def provider_client(provider: str) -> ProviderClient:
+    """Shared pooled client for `provider`, kept open across tasks."""
+    client = _clients.get(provider)
+    if client is None:
+        transport = _transport_factory(provider) if _transport_factory else None
+        client = _clients[provider] = ProviderClient(provider, transport=transport)
+    return client
+
+
+def set_transport_factory(factory: Callable[[str], httpx.AsyncBaseTransport] | None) -> None:
+    """Build provider clients on transports from `factory` (load tests).
+
+    Must be called before the first `provider_client` call of the process.
+    """
+    global _transport_factory
+    if _clients:
+        raise RuntimeError("Provider clients already created; set the transport factory first")
+    _transport_factory = factory
+
+
+async def close_provider_clients() -> None:
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+async def _close() -> None:
+    await close_provider_clients()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+@worker_process_init.connect
+def _init_worker_process(**_: Any) -> None:
+    # Connections inherited from the parent across fork() must not be reused;
+    # drop them without closing the parent's sockets.
+    engine.sync_engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.sync_engine.dispose(close=False)
+    get_loop()
+    logger.info("Worker event loop started")
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**_: Any) -> None:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        return
+    _loop.run_until_complete(_close())
+    _loop.close()
+    _loop = None
@@ -0,0 +1,142 @@
+"""Proactive OAuth token renewal for wearable accounts.
+
+A beat task finds Fitbit and Oura accounts whose access token expires within
+`wearable_token_refresh_lead_minutes` and renews them in bounded batches, so
+the data pulls in `wearables.py` never wait on an OAuth round trip. Refresh
+tokens are single-use, so each account is refreshed under a Redis lock and
+re-read inside it: a worker that loses the race sees the new expiry and
+skips instead of replaying a consumed refresh token. The lock is extended
+before every attempt (including retries after backoff), and an attempt is
+never sent once the lock has been lost.
+"""
+from __future__ import annotations
+
+import base64
+import datetime as dt
+import logging
+from typing import Any, Awaitable, Callable
+
+from redis.exceptions import LockError
+from sqlalchemy import select
+
+from backend.app.core.config import settings
+from backend.app.core.metrics import WEARABLE_TOKENS_REFRESHED
+from backend.app.core.redis import get_redis
+from backend.app.db.session import AsyncSessionLocal
+from backend.app.models.wearable import WearableAccount
+from backend.app.tasks import runtime
+from backend.app.tasks.ingestion import ProviderClient, fan_out
+from backend.app.tasks.wearables import celery_app
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "lock:wearable-token-refresh:{account_id}"
+
+
+def _expiring_before() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc) + dt.timedelta(minutes=settings.wearable_token_refresh_lead_minutes)
+
+
+def _apply_token_response(acc: WearableAccount, tj: dict[str, Any]) -> None:
+    acc.access_token = tj["access_token"]
+    acc.refresh_token = tj.get("refresh_token", acc.refresh_token)
+    exp_sec = tj.get("expires_in")
+    if exp_sec:
+        acc.expires_at = dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=exp_sec)
+
+
+def _lock_window() -> float:
+    """Lock TTL covering one attempt plus the longest backoff before the next."""
+    return 2 * settings.wearable_http_timeout_seconds + settings.wearable_http_max_retry_delay_seconds
+
+
+KeepLock = Callable[[], Awaitable[None]]
+
+
+async def _refresh_fitbit_token(client: ProviderClient, acc: WearableAccount, keep_lock: KeepLock) -> bool:
+    """Refresh Fitbit access token using stored refresh_token."""
+    auth_header = base64.b64encode(f"{settings.fitbit_client_id}:{settings.fitbit_client_secret}".encode()).decode()
+    headers = {"Authorization": f"Basic {auth_header}", "Content-Type": "application/x-www-form-urlencoded"}
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": acc.refresh_token,
+    }
+    r = await client.post("/oauth2/token", data=data, headers=headers, before_send=keep_lock)
+    if r.status_code != 200:
+        logger.warning("Fitbit refresh failed %s", r.text[:200])
+        return False
+    _apply_token_response(acc, r.json())
+    return True
+
+
+async def _refresh_oura_token(client: ProviderClient, acc: WearableAccount, keep_lock: KeepLock) -> bool:
+    """Refresh Oura access token using stored refresh_token."""
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": acc.refresh_token,
+        "client_id": settings.oura_client_id,
+        "client_secret": settings.oura_client_secret,
+    }
+    r = await client.post("/oauth/token", data=data, before_send=keep_lock)
+    if r.status_code != 200:
+        logger.warning("Oura refresh failed %s", r.text[:200])
+        return False
+    _apply_token_response(acc, r.json())
+    return True
+
+
+REFRESHERS: dict[str, Callable[[ProviderClient, WearableAccount, KeepLock], Awaitable[bool]]] = {
+    "fitbit": _refresh_fitbit_token,
+    "oura": _refresh_oura_token,
+}
+
+
+async def _refresh_account(account_id: int) -> bool:
+    """Single-flight refresh of one account; False if skipped or failed."""
+    lock = get_redis().lock(LOCK_KEY.format(account_id=account_id), timeout=_lock_window())
+    if not await lock.acquire(blocking=False):
+        return False  # another worker is refreshing this account right now
+
+    async def keep_lock() -> None:
+        # Raises LockNotOwnedError if the lock lapsed (e.g. a long rate-limit
+        # wait), so the single-use refresh token is never sent unlocked
+        await lock.extend(_lock_window(), replace_ttl=True)
+    try:
+        async with AsyncSessionLocal() as session:
+            acc = await session.get(WearableAccount, account_id)
+            # Re-check under the lock: a concurrent worker may have just renewed it
+            if acc is None or not acc.refresh_token or (acc.expires_at and acc.expires_at > _expiring_before()):
+                return False
+            refreshed = await REFRESHERS[acc.provider](runtime.provider_client(acc.provider), acc, keep_lock)
+            if refreshed:
+                await session.commit()
+            return refreshed
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            logger.warning("Token refresh lock for account %s expired before release", account_id)
+
+
+async def _refresh_expiring() -> int:
+    async with AsyncSessionLocal() as session:
+        account_ids = (await session.execute(
+            select(WearableAccount.id)
+            .where(WearableAccount.provider.in_(list(REFRESHERS)))
+            .where(WearableAccount.refresh_token.is_not(None))
+            .where(WearableAccount.expires_at < _expiring_before())
+            .order_by(WearableAccount.expires_at)
+            .limit(settings.wearable_token_refresh_batch_size)
+        )).scalars().all()
+
+    results = await fan_out(account_ids, _refresh_account)
+    refreshed = sum(bool(r) for r in results)
+    WEARABLE_TOKENS_REFRESHED.inc(refreshed)
+    logger.info("Refreshed %d/%d expiring wearable tokens", refreshed, len(account_ids))
+    return refreshed
+
+
+@celery_app.task(name="wearables.refresh_tokens")
+def refresh_tokens() -> int:
+    """Renew Fitbit and Oura tokens that expire soon, soonest first."""
+    return runtime.run(_refresh_expiring())
@@ -2,114 +2,261 @@ from __future__ import annotations
 
 import datetime as dt
 import logging
-from typing import Any
+from typing import Any, Awaitable, Callable
 
-import httpx
-from celery import Celery
+from celery import Celery, chord, group
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.core.config import settings
+from backend.app.core.metrics import WEARABLE_ACCOUNTS, WEARABLE_READINGS
 from backend.app.db.session import AsyncSessionLocal
 from backend.app.models.wearable import WearableAccount, WearableReading
+from backend.app.services.sleep_summary import invalidate_user_summaries
+from backend.app.tasks import runtime
+from backend.app.tasks.ingestion import ProviderClient, fan_out
 
 logger = logging.getLogger(__name__)
 
+# (metric, day, payload) tuples returned by a per-account sync
+Readings = list[tuple[str, dt.date, Any]]
+# sync_account(client, account, start_day, end_day) -> readings, or None on failure
+SyncAccount = Callable[[ProviderClient, WearableAccount, dt.date, dt.date], Awaitable[Readings | None]]
+
+FITBIT_MAX_RANGE_DAYS = 100
+
 celery_app = Celery("sleepfix"); celery_app.conf.broker_url = settings.redis_url
+# Chords need a result backend to collect per-shard stats
+celery_app.conf.result_backend = settings.redis_url
 
-# Beat schedule every 30 minutes
+# Beat schedule every 30 minutes; provider entries only dispatch shard subtasks
 celery_app.conf.beat_schedule = {
     "pull-fitbit": {"task": "wearables.pull_fitbit", "schedule": 30 * 60},
     "pull-oura": {"task": "wearables.pull_oura", "schedule": 30 * 60},
     "pull-google-fit": {"task": "wearables.pull_google_fit", "schedule": 30 * 60},
+    "refresh-wearable-tokens": {"task": "wearables.refresh_tokens", "schedule": settings.wearable_token_refresh_interval_seconds},
+    "rollup-wearable-readings": {"task": "wearables.rollup_readings", "schedule": 60 * 60},
+    "manage-wearable-partitions": {"task": "wearables.manage_partitions", "schedule": 24 * 60 * 60},
+    "export-analytics-snapshot": {"task": "analytics.export_snapshot", "schedule": settings.analytics_snapshot_interval_seconds},
 }
 
 
-async def _save_reading(session: AsyncSession, account: WearableAccount, metric: str, timestamp: dt.datetime, data: Any):
-    reading = WearableReading(
-        user_id=account.user_id,
-        provider=account.provider,
-        metric=metric,
-        timestamp=timestamp,
-        data=data,
-    )
-    session.add(reading)
+def _reading_row(account: WearableAccount, metric: str, day: dt.date, data: Any, timestamp: dt.datetime) -> dict[str, Any]:
+    return {
+        "user_id": account.user_id,
+        "provider": account.provider,
+        "metric": metric,
+        "day": day,
+        "timestamp": timestamp,
+        "data": data,
+    }
+
+
+def _sync_window(acc: WearableAccount, today: dt.date) -> tuple[dt.date, dt.date]:
+    """Return the inclusive day range to fetch for `acc`.
+
+    Normally this is the delta since the account's cursor, re-reading the
+    last `wearable_sync_overlap_days` because providers keep amending recent
+    nights. New accounts and accounts returning after an outage backfill,
+    but never further than `wearable_backfill_max_days`.
+    """
+    earliest = today - dt.timedelta(days=settings.wearable_backfill_max_days - 1)
+    if acc.synced_through is None:
+        return earliest, today
+    start = acc.synced_through - dt.timedelta(days=settings.wearable_sync_overlap_days)
+    return max(start, earliest), today
+
+
+def _group_by_day(records: list[dict[str, Any]], day_field: str) -> dict[dt.date, list[dict[str, Any]]]:
+    days: dict[dt.date, list[dict[str, Any]]] = {}
+    for record in records:
+        days.setdefault(dt.date.fromisoformat(record[day_field]), []).append(record)
+    return days
+
+
+async def _save_readings(session: AsyncSession, rows: list[dict[str, Any]]) -> int:
+    """Upsert readings in fixed-size multi-row INSERT ... ON CONFLICT chunks.
+
+    Rows are deduplicated on the natural key (user, provider, metric, day)
+    first, the last one winning, since Postgres refuses to update the same
+    row twice in one statement. Each chunk commits on its own so a failure
+    late in a large batch keeps what was already written. Returns the number
+    of rows written.
+    """
+    unique = {(r["user_id"], r["provider"], r["metric"], r["day"]): r for r in rows}
+    rows = list(unique.values())
+    chunk_size = settings.wearable_upsert_chunk_size
+    for start in range(0, len(rows), chunk_size):
+        stmt = pg_insert(WearableReading).values(rows[start:start + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_reading_user_provider_metric_day",
+            set_={"timestamp": stmt.excluded.timestamp, "data": stmt.excluded.data},
+        )
+        await session.execute(stmt)
+        await session.commit()
+    return len(rows)
+
+
+async def _pull_provider(provider: str, sync_account: SyncAccount, shard: int = 0, shard_count: int = 1) -> dict[str, Any]:
+    """Sync one shard of `provider`'s accounts concurrently over one pooled client."""
+    async with AsyncSessionLocal() as session:
+        accounts = (await session.execute(
+            select(WearableAccount)
+            .where(WearableAccount.provider == provider)
+            .where(WearableAccount.id % shard_count == shard)
+        )).scalars().all()
+
+        today = dt.datetime.utcnow().date()
+        windows = {acc.id: _sync_window(acc, today) for acc in accounts}
+        client = runtime.provider_client(provider)
+        results = await fan_out(accounts, lambda acc: sync_account(client, acc, *windows[acc.id]))
+
+        now = dt.datetime.now(dt.timezone.utc)
+        rows = [
+            _reading_row(acc, metric, day, data, now)
+            for acc, readings in zip(accounts, results)
+            for metric, day, data in readings or []
+        ]
+        written = await _save_readings(session, rows)
+        await invalidate_user_summaries(*{r["user_id"] for r in rows if r["metric"] == "sleep"})
+
+        # Advance cursors only once the readings they cover are stored. Only
+        # the cursor columns are written so tokens renewed concurrently by the
+        # refresh scheduler are never overwritten with the copies loaded here.
+        synced_ids = [acc.id for acc, readings in zip(accounts, results) if readings is not None]
+        if synced_ids:
+            await session.execute(
+                update(WearableAccount)
+                .where(WearableAccount.id.in_(synced_ids))
+                .values(synced_through=today, last_synced_at=now)
+            )
+        await session.commit()
+        synced = len(synced_ids)
+        WEARABLE_ACCOUNTS.labels(provider, "synced").inc(synced)
+        WEARABLE_ACCOUNTS.labels(provider, "failed").inc(len(accounts) - synced)
+        WEARABLE_READINGS.labels(provider).inc(written)
+        logger.info("%s shard %d/%d: synced %d/%d accounts, %d readings",
+                    provider, shard, shard_count, synced, len(accounts), written)
+        return {"accounts": len(accounts), "synced": synced, "readings": written}
+
+
+async def _sync_fitbit_account(client: ProviderClient, acc: WearableAccount, start: dt.date, end: dt.date) -> Readings | None:
+    # Tokens are renewed ahead of expiry by tasks/tokens.py, never inline here
+    headers = {"Authorization": f"Bearer {acc.access_token}"}
+    logs: list[dict[str, Any]] = []
+    # The sleep range endpoint accepts at most 100 days per call
+    while start <= end:
+        chunk_end = min(end, start + dt.timedelta(days=FITBIT_MAX_RANGE_DAYS - 1))
+        r = await client.get(f"/1.2/user/-/sleep/date/{start.isoformat()}/{chunk_end.isoformat()}.json", headers=headers)
+        if r.status_code != 200:
+            logger.warning("Fitbit API error %s", r.text[:200])
+            return None
+        logs.extend(r.json().get("sleep", []))
+        start = chunk_end + dt.timedelta(days=1)
+    return [("sleep", day, {"sleep": day_logs}) for day, day_logs in _group_by_day(logs, "dateOfSleep").items()]
 
 
 @celery_app.task(name="wearables.pull_fitbit")
 def pull_fitbit():
-    """Fetch latest sleep & readiness from Fitbit for all linked accounts (simplified)."""
-    import asyncio
-
-    async def _run():
-        async with AsyncSessionLocal() as session:
-            accounts = (await session.execute(
-                """SELECT * FROM wearable_accounts WHERE provider = 'fitbit'"""
-            )).scalars().all()
-
-            for acc in accounts:
-                # Refresh if token is expiring soon (5 min buffer)
-                if acc.expires_at and acc.expires_at - dt.timedelta(minutes=5) < dt.datetime.utcnow():
-                    await _refresh_fitbit_token(acc, session)
-
-                # TODO: error handling for refresh failures
-                headers = {"Authorization": f"Bearer {acc.access_token}"}
-                async with httpx.AsyncClient(timeout=20) as client:
-                    # Example endpoint
-                    url = "https://api.fitbit.com/1.2/user/-/sleep/date/today.json"
-                    r = await client.get(url, headers=headers)
-                    if r.status_code != 200:
-                        logger.warning("Fitbit API error %s", r.text[:200])
-                        continue
-                    sleep_json = r.json()
-                    # Extract summary sleep score etc. This is placeholder.
-                    timestamp = dt.datetime.utcnow()
-                    await _save_reading(session, acc, "sleep", timestamp, sleep_json)
-
-            await session.commit()
-
-    asyncio.run(_run())
-
-
-# TODO: similar tasks for Oura, Google Fit 
+    """Fetch sleep logs from Fitbit since each linked account's sync cursor."""
+    _dispatch("fitbit")
+
+
 # ----------------- Oura -----------------
 
+async def _sync_oura_account(client: ProviderClient, acc: WearableAccount, start: dt.date, end: dt.date) -> Readings | None:
+    headers = {"Authorization": f"Bearer {acc.access_token}"}
+    # end_date is exclusive on the v2 collection endpoints
+    params = {"start_date": start.isoformat(), "end_date": (end + dt.timedelta(days=1)).isoformat()}
+    records: list[dict[str, Any]] = []
+    while True:
+        r = await client.get("/v2/usercollection/sleep", params=params, headers=headers)
+        if r.status_code != 200:
+            logger.warning("Oura API error %s", r.text[:200])
+            return None
+        body = r.json()
+        records.extend(body.get("data", []))
+        if not body.get("next_token"):
+            break
+        params["next_token"] = body["next_token"]
+    return [("sleep", day, {"data": day_records}) for day, day_records in _group_by_day(records, "day").items()]
+
+
 @celery_app.task(name="wearables.pull_oura")
 def pull_oura():
-    """Pull daily sleep score from Oura Cloud API (placeholder)."""
-    import asyncio, json
+    """Pull sleep periods from Oura Cloud API since each account's sync cursor."""
+    _dispatch("oura")
+
+
+# ----------------- Sharded fan-out -----------------
+
+SYNCERS: dict[str, SyncAccount] = {
+    "fitbit": _sync_fitbit_account,
+    "oura": _sync_oura_account,
+}
+
 
-    async def _run():
-        async with AsyncSessionLocal() as session:
-            accounts = (await session.execute(
-                """SELECT * FROM wearable_accounts WHERE provider = 'oura'"""
-            )).scalars().all()
+def _dispatch(provider: str) -> None:
+    """Enqueue one subtask per account shard, reporting totals once all finish.
 
-            for acc in accounts:
-                headers = {"Authorization": f"Bearer {acc.access_token}"}
-                today = dt.date.today().isoformat()
-                url = f"https://api.ouraring.com/v2/usercollection/sleep?start_date={today}&end_date={today}"
-                async with httpx.AsyncClient(timeout=20) as client:
-                    r = await client.get(url, headers=headers)
-                    if r.status_code != 200:
-                        logger.warning("Oura API error %s", r.text[:200])
-                        continue
-                    data = r.json()
-                    timestamp = dt.datetime.utcnow()
-                    await _save_reading(session, acc, "sleep", timestamp, data)
+    Accounts are split by ``id % shard_count`` so shards stay balanced as
+    accounts are linked and no account lands in two shards.
+    """
+    shard_count = settings.wearable_shard_count
+    header = group(sync_shard.s(provider, shard, shard_count) for shard in range(shard_count))
+    chord(header)(report_cycle.s(provider))
 
-            await session.commit()
 
-    asyncio.run(_run())
+@celery_app.task(name="wearables.sync_shard")
+def sync_shard(provider: str, shard: int, shard_count: int) -> dict[str, Any]:
+    """Sync the accounts of `provider` whose id falls in `shard`."""
+    return runtime.run(_pull_provider(provider, SYNCERS[provider], shard, shard_count))
+
+
+@celery_app.task(name="wearables.report_cycle")
+def report_cycle(results: list[dict[str, Any]], provider: str) -> dict[str, Any]:
+    """Chord callback: sum per-shard stats into one per-cycle report."""
+    totals = {"provider": provider, "shards": len(results), "accounts": 0, "synced": 0, "readings": 0}
+    for stats in results:
+        for key in ("accounts", "synced", "readings"):
+            totals[key] += stats[key]
+    logger.info("%s cycle: %d shards, synced %d/%d accounts, %d readings",
+                provider, totals["shards"], totals["synced"], totals["accounts"], totals["readings"])
+    return totals
 
 
 # ----------------- Google Fit -----------------
 
+async def _pull_google_fit(client: ProviderClient, access_token: str) -> int:
+    """Fetch the last day of aggregated sleep segments; returns readings written."""
+    now = dt.datetime.utcnow()
+    body = {
+        "aggregateBy": [{"dataTypeName": "com.google.sleep.segment"}],
+        "bucketByTime": {"durationMillis": 24 * 60 * 60 * 1000},
+        "startTimeMillis": int((now - dt.timedelta(days=1)).timestamp() * 1000),
+        "endTimeMillis": int(now.timestamp() * 1000),
+    }
+    r = await client.post(
+        "/fitness/v1/users/me/dataset:aggregate", json=body, headers={"Authorization": f"Bearer {access_token}"}
+    )
+    if r.status_code != 200:
+        logger.warning("Google Fit error %s", r.text[:200])
+        return 0
+    async with AsyncSessionLocal() as session:
+        # For SA model, readings likely aggregated for single org account – tie to org id 0
+        # Store under a synthetic account since SA has no user
+        synthetic_account = WearableAccount(user_id=0, provider="google_fit", access_token="", refresh_token=None)
+        written = await _save_readings(session, [_reading_row(synthetic_account, "sleep", now.date(), r.json(), now)])
+    WEARABLE_READINGS.labels("google_fit").inc(written)
+    return written
+
+
 @celery_app.task(name="wearables.pull_google_fit")
 def pull_google_fit():
     """Pull aggregated sleep data using Google Fit REST + SA credentials."""
-    import asyncio, json, google.auth
     from google.oauth2 import service_account
-    from google.auth.transport.requests import AuthorizedSession
+    from google.auth.transport.requests import Request
 
     if not settings.google_fit_service_account_json:
         logger.info("Google Fit SA not configured, skipping")
@@ -119,50 +266,6 @@ def pull_google_fit():
     creds = service_account.Credentials.from_service_account_file(
         settings.google_fit_service_account_json, scopes=SCOPES
     )
-    authed = AuthorizedSession(creds)
-
-    async def _run():
-        async with AsyncSessionLocal() as session:
-            # For SA model, readings likely aggregated for single org account – tie to org id 0
-            url = "https://www.googleapis.com/fitness/v1/users/me/dataset:aggregate"
-            body = {
-                "aggregateBy": [{"dataTypeName": "com.google.sleep.segment"}],
-                "bucketByTime": {"durationMillis": 24 * 60 * 60 * 1000},
-                "startTimeMillis": int((dt.datetime.utcnow() - dt.timedelta(days=1)).timestamp() * 1000),
-                "endTimeMillis": int(dt.datetime.utcnow().timestamp() * 1000),
-            }
-            r = authed.post(url, json=body)
-            if r.status_code != 200:
-                logger.warning("Google Fit error %s", r.text[:200])
-                return
-            data = r.json()
-            # Store under a synthetic account since SA has no user
-            timestamp = dt.datetime.utcnow()
-            synthetic_account = WearableAccount(user_id=0, provider="google_fit", access_token="", refresh_token=None)
-            await _save_reading(session, synthetic_account, "sleep", timestamp, data)
-            await session.commit()
-
-    asyncio.run(_run()) 
-
-async def _refresh_fitbit_token(acc: WearableAccount, session: AsyncSession):
-    """Refresh Fitbit access token using stored refresh_token."""
-    if not acc.refresh_token:
-        return
-    auth_header = base64.b64encode(f"{settings.fitbit_client_id}:{settings.fitbit_client_secret}".encode()).decode()
-    headers = {"Authorization": f"Basic {auth_header}", "Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "refresh_token",
-        "refresh_token": acc.refresh_token,
-    }
-    async with httpx.AsyncClient() as client:
-        r = await client.post("https://api.fitbit.com/oauth2/token", data=data, headers=headers)
-        if r.status_code != 200:
-            logger.warning("Fitbit refresh failed %s", r.text[:200])
-            return
-        tj = r.json()
-        acc.access_token = tj["access_token"]
-        acc.refresh_token = tj.get("refresh_token", acc.refresh_token)
-        exp_sec = tj.get("expires_in")
-        if exp_sec:
-            acc.expires_at = dt.datetime.utcnow() + dt.timedelta(seconds=exp_sec)
-        await session.flush() 
\ No newline at end of file
+    creds.refresh(Request())
+    # The REST call itself goes through the shared pooled, rate-limited client
+    runtime.run(_pull_google_fit(runtime.provider_client("google_fit"), creds.token))
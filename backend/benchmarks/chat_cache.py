@@ -0,0 +1,129 @@
+"""Replay a synthetic chat workload and report the response cache hit rate.
+
+    python -m backend.benchmarks.chat_cache --users 500 --messages 20 --generic-share 0.6
+
+Runs the route's own prompt planning (`chat._build_prompt`) and the real
+`chat_cache` with a process-local backend. Every simulated user already has
+conversation memory, which grows with each exchange as in production
+(`load_context` is answered from memory instead of Mongo). Generic prompts
+are drawn from a skewed set of common sleep questions written with varying
+case and punctuation; the rest are personal or follow-up questions. No
+Gemini, Mongo or Redis is contacted.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+from backend.app.api.routes import chat
+from backend.app.models.user import User
+from backend.app.services import chat_cache, chat_memory
+from backend.app.services.chat_memory import ConversationContext
+from backend.benchmarks.run import RESULTS_DIR, _git_revision
+
+GENERIC_PROMPTS = [
+    "How much sleep does an adult need?",
+    "What is deep sleep?",
+    "Does caffeine affect sleep?",
+    "What is a good bedtime routine?",
+    "How long before bed should you stop using screens?",
+    "Is napping during the day bad for sleep?",
+    "What is sleep hygiene?",
+    "Does alcohol help you sleep?",
+    "What is REM sleep?",
+    "How do you fix a sleep schedule after jet lag?",
+    "What temperature is best for sleeping?",
+    "Does exercise improve sleep quality?",
+]
+PERSONAL_PROMPTS = [
+    "Why do I keep waking up at 3am?",
+    "My PSQI score went up, what should I change?",
+    "Can you explain that again?",
+    "I slept 5 hours last night, is that a problem?",
+    "What else could help me?",
+    "We have a newborn, any tips for us?",
+]
+
+
+def _variant(prompt: str, rng: random.Random) -> str:
+    """Same question as users actually type it: case, spacing, punctuation."""
+    text = prompt.lower() if rng.random() < 0.4 else prompt
+    if rng.random() < 0.3:
+        text = text.rstrip("?") + rng.choice(["", "??", " ?", "."])
+    return f"  {text} " if rng.random() < 0.1 else text
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    histories: dict[int, ConversationContext] = {
+        uid: ConversationContext(summary=f"User {uid} has trouble falling asleep.") for uid in range(args.users)
+    }
+
+    async def load_context(user_id: int) -> ConversationContext:
+        return histories[user_id]
+
+    chat_memory.load_context = load_context
+    # Zipf-like popularity: a handful of questions make up most generic traffic
+    weights = [1 / (rank + 1) for rank in range(len(GENERIC_PROMPTS))]
+
+    counts = {"requests": 0, "cacheable": 0, "hits": 0, "generic": 0, "generic_hits": 0}
+    for _ in range(args.messages):
+        for uid in rng.sample(range(args.users), args.users):
+            generic = rng.random() < args.generic_share
+            base = rng.choices(GENERIC_PROMPTS, weights)[0] if generic else rng.choice(PERSONAL_PROMPTS)
+            message = _variant(base, rng)
+            _, key = await chat._build_prompt(User(id=uid), message)
+            counts["requests"] += 1
+            counts["generic"] += chat_cache.is_generic(message)
+            reply = None
+            if key is not None:
+                counts["cacheable"] += 1
+                reply = await chat_cache.get_reply(key)
+            if reply is not None:
+                counts["hits"] += 1
+                counts["generic_hits"] += chat_cache.is_generic(message)
+            else:
+                reply = f"(answer to {base})"
+                if key is not None:
+                    await chat_cache.store_reply(key, reply)
+            histories[uid].turns.append({"user_message": message, "assistant_response": reply})
+
+    return {
+        "meta": {
+            "started_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "args": vars(args),
+        },
+        **counts,
+        "hit_rate": round(counts["hits"] / counts["requests"], 4),
+        "generic_hit_rate": round(counts["generic_hits"] / counts["generic"], 4) if counts["generic"] else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20, help="messages per user")
+    parser.add_argument("--generic-share", type=float, default=0.6, help="share of generic questions")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, help="results file (default: benchmarks/results/chat-cache-<timestamp>.json)")
+    args = parser.parse_args()
+
+    # Same as CHAT_CACHE_BACKEND=memory: the local tier keeps the full TTL
+    chat_cache.response_cache.use_redis = False
+    chat_cache.response_cache.local.ttl = chat_cache.response_cache.ttl
+    report = asyncio.run(run(args))
+    print(json.dumps({k: v for k, v in report.items() if k != "meta"}))
+    out = args.out or RESULTS_DIR / f"chat-cache-{dt.datetime.utcnow():%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, default=str))
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m backend.benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 when any scenario's p95 latency grew, or its throughput
+dropped, by more than `--threshold` percent.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+
+def _load(path: Path) -> dict[tuple[str, int], dict[str, Any]]:
+    results = json.loads(path.read_text())["results"]
+    return {(r["scenario"], r.get("concurrency", 1)): r for r in results if "latency_ms" in r}
+
+
+def _change(before: float | None, after: float | None) -> float | None:
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def _fmt(change: float | None) -> str:
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    baseline, candidate = _load(args.baseline), _load(args.candidate)
+    regressions = []
+    print(f"{'scenario':<24}{'c':>4}{'p95 before':>12}{'p95 after':>12}{'p95':>9}{'rps':>9}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        p95 = _change(before["latency_ms"]["p95"], after["latency_ms"]["p95"])
+        rps = _change(before["throughput_rps"], after["throughput_rps"])
+        flag = ""
+        if (p95 is not None and p95 > args.threshold) or (rps is not None and rps < -args.threshold):
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key[0]:<24}{key[1]:>4}{before['latency_ms']['p95']:>12.2f}{after['latency_ms']['p95']:>12.2f}"
+              f"{_fmt(p95):>9}{_fmt(rps):>9}{flag}")
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{key[0]:<24}{key[1]:>4}  only in {'baseline' if key in baseline else 'candidate'}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Load-test wearable ingestion against the provider simulator.
+
+    python -m backend.benchmarks.ingest --cycles 3 --latency-ms 80 --error-rate 0.02 --rate-limit 150
+
+Runs the real shard body (`_pull_provider`), the token refresh scheduler
+(`_refresh_expiring`) and `_pull_google_fit` in-process, with every provider
+call answered by `simulator.ProviderSimulator`. Accounts come from the
+benchmark database (`seed.py`). Per cycle it reports accounts per second,
+upstream calls per account, 429/5xx counts and rows written.
+
+Client-side limits are the regular settings (FITBIT_REQUESTS_PER_SECOND,
+WEARABLE_INGEST_CONCURRENCY, ...); set them in the environment to test
+other values. Token refresh takes Redis locks, so it needs a local Redis.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import update
+
+from backend.app.db.session import AsyncSessionLocal, engine
+from backend.app.models.wearable import WearableAccount
+from backend.app.tasks import runtime
+from backend.app.tasks.tokens import REFRESHERS, _refresh_expiring
+from backend.app.tasks.wearables import SYNCERS, _pull_google_fit, _pull_provider
+from backend.benchmarks.run import RESULTS_DIR, _git_revision
+from backend.benchmarks.simulator import ProviderSimulator, SimulatorConfig
+
+simulators: dict[str, ProviderSimulator] = {}
+
+
+async def _measure(provider: str, body: Callable[[], Awaitable[Any]]) -> tuple[Any, float, dict[str, Any]]:
+    stats = simulators[provider].stats
+    calls_before, statuses_before = stats.calls, stats.statuses.copy()
+    started = time.perf_counter()
+    result = await body()
+    seconds = time.perf_counter() - started
+    statuses = stats.statuses - statuses_before
+    upstream = {
+        "calls": stats.calls - calls_before,
+        "rate_limited": statuses.get(429, 0),
+        "server_errors": sum(v for k, v in statuses.items() if k >= 500),
+    }
+    return result, seconds, upstream
+
+
+async def _rewind_cursors(provider: str, backfill_days: int | None) -> None:
+    """Move sync cursors back so each cycle fetches a comparable window."""
+    synced_through = None if backfill_days is None else dt.datetime.utcnow().date() - dt.timedelta(days=backfill_days)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(WearableAccount).where(WearableAccount.provider == provider).values(synced_through=synced_through)
+        )
+        await session.commit()
+
+
+async def pull_cycle(provider: str, cycle: int, backfill_days: int | None) -> dict[str, Any]:
+    await _rewind_cursors(provider, backfill_days)
+    stats, seconds, upstream = await _measure(provider, lambda: _pull_provider(provider, SYNCERS[provider]))
+    accounts = stats["accounts"]
+    return {
+        "phase": "pull",
+        "provider": provider,
+        "cycle": cycle,
+        "seconds": round(seconds, 2),
+        **stats,
+        "rows_written": stats["readings"],
+        "accounts_per_second": round(accounts / seconds, 2) if seconds else None,
+        "calls_per_account": round(upstream["calls"] / accounts, 2) if accounts else None,
+        **upstream,
+    }
+
+
+async def token_cycle(cycle: int) -> dict[str, Any]:
+    """Mark every refreshable account as expiring and time one scheduler run."""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(WearableAccount)
+            .where(WearableAccount.provider.in_(list(REFRESHERS)))
+            .values(expires_at=dt.datetime.now(dt.timezone.utc))
+        )
+        await session.commit()
+    started = time.perf_counter()
+    calls_before = {p: simulators[p].stats.calls for p in REFRESHERS}
+    refreshed = await _refresh_expiring()
+    seconds = time.perf_counter() - started
+    calls = sum(simulators[p].stats.calls - calls_before[p] for p in REFRESHERS)
+    return {
+        "phase": "refresh_tokens",
+        "cycle": cycle,
+        "seconds": round(seconds, 2),
+        "refreshed": refreshed,
+        "accounts_per_second": round(refreshed / seconds, 2) if seconds else None,
+        "calls": calls,
+    }
+
+
+async def google_fit_cycle(cycle: int) -> dict[str, Any]:
+    try:
+        rows, seconds, upstream = await _measure("google_fit", lambda: _pull_google_fit(
+            runtime.provider_client("google_fit"), "sim-service-account-token"))
+    except Exception as exc:
+        # Readings are stored for the placeholder user 0, which may not exist here
+        return {"phase": "pull", "provider": "google_fit", "cycle": cycle, "error": repr(exc)}
+    return {"phase": "pull", "provider": "google_fit", "cycle": cycle, "seconds": round(seconds, 2),
+            "rows_written": rows, **upstream}
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    config = SimulatorConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_per_second=args.rate_limit,
+        payload_padding_bytes=args.payload_bytes,
+    )
+    simulators.update({p: ProviderSimulator(p, config) for p in ("fitbit", "oura", "google_fit")})
+    runtime.set_transport_factory(simulators.__getitem__)
+
+    results = []
+    for cycle in range(1, args.cycles + 1):
+        for provider in args.providers:
+            if provider == "google_fit":
+                result = await google_fit_cycle(cycle)
+            else:
+                result = await pull_cycle(provider, cycle, args.backfill_days)
+            print(json.dumps(result))
+            results.append(result)
+        if args.refresh_tokens:
+            result = await token_cycle(cycle)
+            print(json.dumps(result))
+            results.append(result)
+    return {
+        "meta": {
+            "started_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "simulator": vars(config),
+        },
+        "results": results,
+        "upstream": {p: s.stats.snapshot() for p, s in simulators.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", nargs="+", choices=("fitbit", "oura", "google_fit"), default=["fitbit", "oura"])
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--backfill-days", type=int, default=7,
+                        help="rewind cursors this far before each cycle (-1: full backfill)")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=25.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream calls answered with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="upstream requests/s before 429s")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="padding added to every sleep record")
+    parser.add_argument("--refresh-tokens", action="store_true", help="also run the token refresh scheduler")
+    parser.add_argument("--out", type=Path, help="results file (default: benchmarks/results/ingest-<timestamp>.json)")
+    args = parser.parse_args()
+    if args.backfill_days < 0:
+        args.backfill_days = None
+
+    async def _run() -> dict[str, Any]:
+        try:
+            return await run(args)
+        finally:
+            await runtime.close_provider_clients()
+            await engine.dispose()
+
+    report = asyncio.run(_run())
+    out = args.out or RESULTS_DIR / f"ingest-{dt.datetime.utcnow():%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
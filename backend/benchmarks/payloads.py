@@ -0,0 +1,52 @@
+"""Synthetic provider sleep records shaped like the real Fitbit and Oura APIs.
+
+Shared by `seed.py` (stored readings) and `simulator.py` (HTTP responses) so
+both exercise `services/sleep_metrics.normalize_sleep` the same way.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import random
+from typing import Any
+
+
+def fitbit_sleep_log(rng: random.Random, day: dt.date, minutes: float, padding: int = 0) -> dict[str, Any]:
+    """One entry of Fitbit's ``sleep`` list (v1.2 "stages" log)."""
+    deep, rem = minutes * rng.uniform(0.12, 0.22), minutes * rng.uniform(0.18, 0.25)
+    log = {
+        "dateOfSleep": day.isoformat(),
+        "isMainSleep": True,
+        "minutesAsleep": round(minutes),
+        "efficiency": rng.randint(75, 98),
+        "minutesToFallAsleep": rng.randint(0, 45),
+        "levels": {"summary": {
+            "deep": {"minutes": round(deep)},
+            "rem": {"minutes": round(rem)},
+            "light": {"minutes": round(minutes - deep - rem)},
+            "wake": {"minutes": rng.randint(10, 60)},
+        }},
+    }
+    if padding:
+        # Real logs carry per-30s stage data; padding stands in for its size
+        log["levels"]["data"] = "x" * padding
+    return log
+
+
+def oura_sleep_period(rng: random.Random, day: dt.date, minutes: float, padding: int = 0) -> dict[str, Any]:
+    """One entry of Oura v2 ``usercollection/sleep`` ``data``."""
+    seconds = minutes * 60
+    period = {
+        "day": day.isoformat(),
+        "type": "long_sleep",
+        "total_sleep_duration": round(seconds),
+        "efficiency": rng.randint(75, 98),
+        "latency": rng.randint(0, 45 * 60),
+        "deep_sleep_duration": round(seconds * rng.uniform(0.12, 0.22)),
+        "rem_sleep_duration": round(seconds * rng.uniform(0.18, 0.25)),
+        "light_sleep_duration": round(seconds * 0.55),
+        "awake_time": rng.randint(600, 3600),
+    }
+    if padding:
+        # Stands in for the hypnogram / heart-rate series real periods include
+        period["sleep_phase_5_min"] = "1" * padding
+    return period
@@ -0,0 +1,261 @@
+"""Drive the API in-process and record latency percentiles and throughput.
+
+    python -m backend.benchmarks.run --out before.json
+    python -m backend.benchmarks.compare before.json after.json
+
+Requests go through `httpx.ASGITransport` straight into the FastAPI app, so
+no server, network or external provider is involved; only the seeded
+Postgres (see `seed.py`) and, if reachable, Redis. Each scenario runs at
+every concurrency level: `--requests` requests are issued by that many
+concurrent clients after `--warmup` untimed ones. Ingestion is measured by
+calling the readings upsert directly.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import httpx
+import numpy as np
+from sqlalchemy import func, select
+
+from backend.app.api.routes.assessments import PSQI_COMPONENT_KEYS
+from backend.app.core.config import settings
+from backend.app.core.security import shutdown_password_hasher
+from backend.app.db.session import AsyncSessionLocal, engine
+from backend.app.main import app
+from backend.app.models.organization import Organization
+from backend.app.models.user import User
+from backend.app.models.wearable import WearableAccount
+from backend.app.tasks.wearables import _save_readings
+from backend.benchmarks.seed import BENCH_PASSWORD, bench_email
+
+API = settings.api_v1_prefix
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_CONCURRENCY = (1, 8, 32)
+TOKEN_POOL = 64  # distinct users logged in for authenticated scenarios
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    org_ids: list[int]
+    user_tokens: list[str]
+    wearable_tokens: list[str]
+    hr_token: str  # the seeded admin, allowed on every HR route
+    user_count: int
+
+
+Request = Callable[[Context, int], Awaitable[httpx.Response]]
+
+
+def _auth(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post(f"{API}/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+
+
+async def _token(client: httpx.AsyncClient, email: str) -> str:
+    r = await _login(client, email)
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+def _psqi_answers(i: int) -> dict[str, int]:
+    rng = random.Random(i)
+    return {k: rng.randrange(4) for k in PSQI_COMPONENT_KEYS}
+
+
+async def _timeseries(ctx: Context, i: int) -> httpx.Response:
+    org_ids = ctx.org_ids[i % len(ctx.org_ids):][:10] or ctx.org_ids[:10]
+    end = dt.date.today()
+    params = [("org_ids", o) for o in org_ids] + [("start", (end - dt.timedelta(days=84)).isoformat()),
+                                                  ("end", end.isoformat()), ("granularity", "week")]
+    return await ctx.client.get(f"{API}/hr/kpis/timeseries", params=params, headers=_auth(ctx.hr_token))
+
+
+SCENARIOS: dict[str, Request] = {
+    "auth.login": lambda ctx, i: _login(ctx.client, bench_email(i % ctx.user_count + 1)),
+    "users.me": lambda ctx, i: ctx.client.get(
+        f"{API}/users/me", headers=_auth(ctx.user_tokens[i % len(ctx.user_tokens)])),
+    "hr.kpis": lambda ctx, i: ctx.client.get(
+        f"{API}/hr/{ctx.org_ids[i % len(ctx.org_ids)]}/kpis", headers=_auth(ctx.hr_token)),
+    "hr.timeseries": _timeseries,
+    "sleep.summary": lambda ctx, i: ctx.client.get(
+        f"{API}/sleep/summary", params={"days": 30}, headers=_auth(ctx.wearable_tokens[i % len(ctx.wearable_tokens)])),
+    "assessments.submit": lambda ctx, i: ctx.client.post(
+        f"{API}/assessments/psqi", json={"answers": _psqi_answers(i)},
+        headers=_auth(ctx.user_tokens[i % len(ctx.user_tokens)])),
+}
+
+
+def _summarize(name: str, concurrency: int, latencies: list[float], errors: int, wall: float, **extra: Any) -> dict[str, Any]:
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99)) if len(ms) else (np.nan,) * 3
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "mean": round(float(ms.mean()), 2) if len(ms) else None,
+            "max": round(float(ms.max()), 2) if len(ms) else None,
+        },
+        **extra,
+    }
+
+
+async def run_scenario(ctx: Context, name: str, request: Request, concurrency: int, total: int, warmup: int) -> dict[str, Any]:
+    for i in range(warmup):
+        await request(ctx, i)
+
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(warmup, warmup + total))
+
+    async def client_loop() -> None:
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await request(ctx, i)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return _summarize(name, concurrency, latencies, errors, time.perf_counter() - started)
+
+
+async def run_ingestion(batches: int, batch_size: int) -> dict[str, Any]:
+    """Time `_save_readings` on batches of one reading per wearable user.
+
+    Rows use a dedicated "bench" metric so seeded sleep data is untouched;
+    the first batch per day inserts and later ones exercise the upsert path.
+    """
+    async with AsyncSessionLocal() as session:
+        accounts = (await session.execute(
+            select(WearableAccount.user_id, WearableAccount.provider).order_by(WearableAccount.id).limit(batch_size)
+        )).all()
+    if not accounts:
+        return {"scenario": "ingestion.save_readings", "skipped": "no wearable accounts seeded"}
+    today = dt.datetime.utcnow().date()
+    now = dt.datetime.now(dt.timezone.utc)
+    latencies = []
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        for b in range(batches):
+            day = today - dt.timedelta(days=b % 2)
+            rows = [
+                {"user_id": uid, "provider": provider, "metric": "bench", "day": day, "timestamp": now,
+                 "data": {"batch": b}}
+                for uid, provider in accounts
+            ]
+            t0 = time.perf_counter()
+            await _save_readings(session, rows)
+            latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - started
+    return _summarize("ingestion.save_readings", 1, latencies, 0, wall,
+                      rows_per_second=round(batches * len(accounts) / wall, 1))
+
+
+async def _context(client: httpx.AsyncClient) -> Context:
+    async with AsyncSessionLocal() as session:
+        org_ids = (await session.execute(select(Organization.id).order_by(Organization.id))).scalars().all()
+        user_count = (await session.execute(select(func.count()).select_from(User))).scalar_one()
+        wearable_emails = (await session.execute(
+            select(User.email).join(WearableAccount, WearableAccount.user_id == User.id)
+            .order_by(User.id).limit(TOKEN_POOL)
+        )).scalars().all()
+    if not org_ids or not user_count:
+        raise SystemExit("Database is empty; run `python -m backend.benchmarks.seed` first")
+    step = max(user_count // TOKEN_POOL, 1)
+    users = [bench_email(i) for i in range(1, user_count + 1, step)][:TOKEN_POOL]
+    return Context(
+        client=client,
+        org_ids=list(org_ids),
+        user_tokens=[await _token(client, e) for e in users],
+        wearable_tokens=[await _token(client, e) for e in wearable_emails] or [await _token(client, users[0])],
+        hr_token=await _token(client, bench_email(1)),
+        user_count=user_count,
+    )
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(scenarios: list[str], concurrency: list[int], requests: int, warmup: int, ingestion_batches: int) -> dict[str, Any]:
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        ctx = await _context(client)
+        for name in scenarios:
+            for level in concurrency:
+                result = await run_scenario(ctx, name, SCENARIOS[name], level, requests, warmup)
+                print(f"{name:<22} c={level:<3} p50={result['latency_ms']['p50']:>8}ms "
+                      f"p95={result['latency_ms']['p95']:>8}ms rps={result['throughput_rps']} errors={result['errors']}")
+                results.append(result)
+    if ingestion_batches:
+        results.append(await run_ingestion(ingestion_batches, settings.wearable_upsert_chunk_size))
+    return {
+        "meta": {
+            "started_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests_per_level": requests,
+            "warmup": warmup,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="repeatable; default all")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--ingestion-batches", type=int, default=10, help="0 skips the ingestion benchmark")
+    parser.add_argument("--out", type=Path, help="results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    async def _run() -> dict[str, Any]:
+        try:
+            return await run(args.scenario or list(SCENARIOS), args.concurrency, args.requests, args.warmup,
+                             args.ingestion_batches)
+        finally:
+            await engine.dispose()
+            shutdown_password_hasher()
+
+    report = asyncio.run(_run())
+    out = args.out or RESULTS_DIR / f"{dt.datetime.utcnow():%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
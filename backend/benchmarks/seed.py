@@ -0,0 +1,212 @@
+"""Seed a local Postgres with benchmark-scale data.
+
+    python -m backend.benchmarks.seed --scale full --reset
+
+Everything is generated from a fixed RNG seed, so two runs at the same
+scale produce identical databases and benchmark results stay comparable.
+Rows are loaded with COPY through asyncpg (`copy_records_to_table`) in
+bounded chunks, so seeding millions of readings needs little memory.
+
+All seeded users share the password `BENCH_PASSWORD`; emails are
+``bench-<i>@example.test`` and the first user of each organization has the
+``hr`` role. The schema relies on Postgres features (JSONB upserts, range
+partitions), so SQLite is not supported.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import text
+
+from backend.app.api.routes.assessments import PSQI_COMPONENT_KEYS
+from backend.app.core.security import get_password_hash
+from backend.app.db.base import Base
+from backend.app.db.session import AsyncSessionLocal, engine
+from backend.app.models import org_daily_psqi, organization, sleep_assessment, user, wearable  # noqa: F401  (register tables)
+from backend.app.services.psqi_aggregates import rebuild_org_daily_psqi
+from backend.app.tasks.rollups import ensure_partitions, rollup_readings
+from backend.benchmarks.payloads import fitbit_sleep_log, oura_sleep_period
+
+logger = logging.getLogger(__name__)
+
+BENCH_PASSWORD = "bench-password"
+RNG_SEED = 20240601
+COPY_CHUNK_ROWS = 50_000
+
+
+@dataclass(frozen=True)
+class Scale:
+    orgs: int
+    users: int
+    assessments_per_user: int
+    reading_days: int
+    wearable_share: float  # fraction of users with a linked wearable
+
+
+SCALES = {
+    "small": Scale(orgs=5, users=2_000, assessments_per_user=4, reading_days=30, wearable_share=0.5),
+    "medium": Scale(orgs=50, users=20_000, assessments_per_user=6, reading_days=60, wearable_share=0.4),
+    # ~1.2M assessments and ~5.4M readings
+    "full": Scale(orgs=200, users=100_000, assessments_per_user=12, reading_days=90, wearable_share=0.3),
+}
+
+
+def bench_email(index: int) -> str:
+    return f"bench-{index}@example.test"
+
+
+def _chunks(rows: Iterable[tuple], size: int = COPY_CHUNK_ROWS) -> Iterator[list[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _copy(table: str, columns: list[str], rows: Iterable[tuple]) -> int:
+    total = 0
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        for chunk in _chunks(rows):
+            await raw.copy_records_to_table(table, records=chunk, columns=columns)
+            total += len(chunk)
+        await conn.commit()
+    logger.info("Copied %d rows into %s", total, table)
+    return total
+
+
+def _users(scale: Scale, password_hash: str) -> Iterator[tuple]:
+    per_org = -(-scale.users // scale.orgs)
+    for i in range(1, scale.users + 1):
+        org_id = (i - 1) // per_org + 1
+        role = "admin" if i == 1 else "hr" if (i - 1) % per_org == 0 else "user"
+        yield (i, bench_email(i), password_hash, f"Bench User {i}", org_id, role)
+
+
+def _assessments(scale: Scale, today: dt.date) -> Iterator[tuple]:
+    rng = random.Random(RNG_SEED + 1)
+    for user_id in range(1, scale.users + 1):
+        for _ in range(scale.assessments_per_user):
+            answers = {k: rng.choices(range(4), weights=(4, 3, 2, 1))[0] for k in PSQI_COMPONENT_KEYS}
+            day = today - dt.timedelta(days=rng.randrange(scale.reading_days))
+            created = dt.datetime.combine(day, dt.time(rng.randrange(24)), tzinfo=dt.timezone.utc)
+            yield (user_id, "PSQI", sum(answers.values()), json.dumps(answers), created)
+
+
+def _wearable_users(scale: Scale) -> list[int]:
+    rng = random.Random(RNG_SEED + 2)
+    return [u for u in range(1, scale.users + 1) if rng.random() < scale.wearable_share]
+
+
+def _accounts(user_ids: list[int], now: dt.datetime) -> Iterator[tuple]:
+    for account_id, user_id in enumerate(user_ids, start=1):
+        provider = "fitbit" if user_id % 2 else "oura"
+        yield (account_id, user_id, provider, f"bench-token-{user_id}", f"bench-refresh-{user_id}",
+               now + dt.timedelta(hours=8), now.date())
+
+
+def _readings(user_ids: list[int], scale: Scale, today: dt.date, now: dt.datetime) -> Iterator[tuple]:
+    rng = random.Random(RNG_SEED + 3)
+    for user_id in user_ids:
+        provider = "fitbit" if user_id % 2 else "oura"
+        baseline = rng.gauss(420, 40)
+        for offset in range(scale.reading_days):
+            day = today - dt.timedelta(days=offset)
+            minutes = max(180.0, rng.gauss(baseline, 45))
+            if provider == "fitbit":
+                sleep = {"sleep": [fitbit_sleep_log(rng, day, minutes)]}
+            else:
+                sleep = {"data": [oura_sleep_period(rng, day, minutes)]}
+            yield (user_id, provider, "sleep", day, now, json.dumps(sleep))
+            activity = {"summary": {"steps": rng.randint(1500, 16000)}}
+            yield (user_id, provider, "activity", day, now, json.dumps(activity))
+
+
+async def _reset() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def _sync_sequences(*tables: str) -> None:
+    async with engine.begin() as conn:
+        for table in tables:
+            await conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+            ))
+
+
+async def seed(scale: Scale, *, reset: bool) -> dict[str, Any]:
+    started = time.perf_counter()
+    today = dt.datetime.utcnow().date()
+    now = dt.datetime.now(dt.timezone.utc)
+    if reset:
+        await _reset()
+    async with AsyncSessionLocal() as session:
+        await ensure_partitions(session, today - dt.timedelta(days=scale.reading_days), today)
+
+    # One bcrypt hash at the configured cost, so logins benchmark realistically
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    wearable_users = _wearable_users(scale)
+    counts = {
+        "organizations": await _copy(
+            "organizations", ["id", "name"], ((i, f"Bench Org {i}") for i in range(1, scale.orgs + 1))
+        ),
+        "users": await _copy(
+            "users", ["id", "email", "hashed_password", "full_name", "organization_id", "role"],
+            _users(scale, password_hash),
+        ),
+        "sleep_assessments": await _copy(
+            "sleep_assessments", ["user_id", "type", "score", "answers", "created_at"], _assessments(scale, today)
+        ),
+        "wearable_accounts": await _copy(
+            "wearable_accounts",
+            ["id", "user_id", "provider", "access_token", "refresh_token", "expires_at", "synced_through"],
+            _accounts(wearable_users, now),
+        ),
+        "wearable_readings": await _copy(
+            "wearable_readings", ["user_id", "provider", "metric", "day", "timestamp", "data"],
+            _readings(wearable_users, scale, today, now),
+        ),
+    }
+    await _sync_sequences("organizations", "users", "wearable_accounts")
+
+    async with AsyncSessionLocal() as session:
+        await rebuild_org_daily_psqi(session)
+    counts["wearable_daily_rollups"] = await rollup_readings(day_from=today - dt.timedelta(days=scale.reading_days))
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+    counts["seconds"] = round(time.perf_counter() - started, 1)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    async def _run() -> dict[str, Any]:
+        try:
+            return await seed(SCALES[args.scale], reset=args.reset)
+        finally:
+            await engine.dispose()
+
+    print(json.dumps(asyncio.run(_run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""In-process stand-ins for the Fitbit, Oura and Google Fit APIs.
+
+`ProviderSimulator` is an `httpx.AsyncBaseTransport`, so installing it with
+`tasks.runtime.set_transport_factory` sends the real ingestion code paths
+(`_pull_provider`, the token refreshers, `_pull_google_fit`) to it instead
+of the network. It serves the sleep and token endpoints those paths call,
+with configurable latency, server-side 429 rate limiting, 5xx error rate
+and payload size, and counts every call it answers.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import json
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import parse_qs
+
+import httpx
+
+from backend.benchmarks.payloads import fitbit_sleep_log, oura_sleep_period
+
+FITBIT_SLEEP_RANGE = re.compile(r"^/1\.2/user/-/sleep/date/(\d{4}-\d{2}-\d{2})/(\d{4}-\d{2}-\d{2})\.json$")
+
+
+@dataclass
+class SimulatorConfig:
+    latency_ms: float = 50.0
+    latency_jitter_ms: float = 25.0
+    error_rate: float = 0.0  # probability of a 503 per request
+    rate_limit_per_second: float | None = None  # per provider; excess requests get 429
+    retry_after_seconds: int = 1
+    payload_padding_bytes: int = 0  # extra bytes per sleep record
+    nights_missing_rate: float = 0.1  # share of nights without a record
+    oura_page_size: int = 25  # records per page before next_token
+    seed: int = 7
+
+
+@dataclass
+class SimulatorStats:
+    calls: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    by_endpoint: Counter = field(default_factory=Counter)
+    bytes_sent: int = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "by_endpoint": dict(self.by_endpoint),
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+class ProviderSimulator(httpx.AsyncBaseTransport):
+    """Fake upstream for one provider ("fitbit", "oura" or "google_fit")."""
+
+    def __init__(self, provider: str, config: SimulatorConfig | None = None):
+        self.provider = provider
+        self.config = config or SimulatorConfig()
+        self.stats = SimulatorStats()
+        self._rng = random.Random(f"{self.config.seed}:{provider}")
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def _rate_limited(self) -> bool:
+        limit = self.config.rate_limit_per_second
+        if not limit:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        return self._window_count > limit
+
+    def _nights(self, start: dt.date, end: dt.date, token: str) -> list[tuple[dt.date, float]]:
+        # Per-account baseline so repeated cycles return consistent data
+        rng = random.Random(f"{self.config.seed}:{token}:{start}")
+        baseline = rng.gauss(420, 40)
+        nights = []
+        day = start
+        while day <= end:
+            if rng.random() >= self.config.nights_missing_rate:
+                nights.append((day, max(180.0, rng.gauss(baseline, 45))))
+            day += dt.timedelta(days=1)
+        return nights
+
+    def _token_response(self) -> dict[str, Any]:
+        n = self._rng.getrandbits(64)
+        return {"access_token": f"sim-access-{n:x}", "refresh_token": f"sim-refresh-{n:x}", "expires_in": 28800}
+
+    def _route(self, request: httpx.Request) -> tuple[str, int, Any]:
+        path = request.url.path
+        token = request.headers.get("Authorization", "")
+        padding = self.config.payload_padding_bytes
+        if self.provider == "fitbit":
+            match = FITBIT_SLEEP_RANGE.match(path)
+            if request.method == "GET" and match:
+                start, end = (dt.date.fromisoformat(g) for g in match.groups())
+                logs = [fitbit_sleep_log(self._rng, d, m, padding) for d, m in self._nights(start, end, token)]
+                return "fitbit.sleep", 200, {"sleep": logs}
+            if request.method == "POST" and path == "/oauth2/token":
+                return "fitbit.token", 200, self._token_response()
+        elif self.provider == "oura":
+            if request.method == "GET" and path == "/v2/usercollection/sleep":
+                params = request.url.params
+                start = dt.date.fromisoformat(params["start_date"])
+                end = dt.date.fromisoformat(params["end_date"]) - dt.timedelta(days=1)  # end_date is exclusive
+                records = [oura_sleep_period(self._rng, d, m, padding) for d, m in self._nights(start, end, token)]
+                offset = int(params.get("next_token", 0))
+                page = records[offset:offset + self.config.oura_page_size]
+                more = offset + self.config.oura_page_size < len(records)
+                return "oura.sleep", 200, {"data": page, "next_token": str(offset + len(page)) if more else None}
+            if request.method == "POST" and path == "/oauth/token":
+                form = parse_qs(request.content.decode())
+                if not form.get("refresh_token"):
+                    return "oura.token", 400, {"error": "invalid_request"}
+                return "oura.token", 200, self._token_response()
+        elif self.provider == "google_fit":
+            if request.method == "POST" and path == "/fitness/v1/users/me/dataset:aggregate":
+                body = json.loads(request.content or b"{}")
+                start_ms, end_ms = body.get("startTimeMillis", 0), body.get("endTimeMillis", 0)
+                points = [
+                    {"startTimeNanos": str(start_ms * 10**6), "endTimeNanos": str(end_ms * 10**6),
+                     "value": [{"intVal": self._rng.choice((1, 4, 5, 6))}]}
+                    for _ in range(self._rng.randint(4, 12))
+                ]
+                return "google_fit.aggregate", 200, {"bucket": [{
+                    "startTimeMillis": str(start_ms), "endTimeMillis": str(end_ms),
+                    "dataset": [{"point": points, "padding": "x" * padding}],
+                }]}
+        return "unknown", 404, {"error": "not_found", "path": path}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.calls += 1
+        jitter = self._rng.uniform(-1, 1) * self.config.latency_jitter_ms
+        await asyncio.sleep(max(0.0, self.config.latency_ms + jitter) / 1000)
+
+        headers = {}
+        if self._rate_limited():
+            endpoint, status, payload = "rate_limited", 429, {"errors": [{"errorType": "rate_limit"}]}
+            headers["Retry-After"] = str(self.config.retry_after_seconds)
+        elif self._rng.random() < self.config.error_rate:
+            endpoint, status, payload = "server_error", 503, {"errors": [{"errorType": "unavailable"}]}
+        else:
+            endpoint, status, payload = self._route(request)
+
+        content = json.dumps(payload).encode()
+        self.stats.statuses[status] += 1
+        self.stats.by_endpoint[endpoint] += 1
+        self.stats.bytes_sent += len(content)
+        return httpx.Response(status, headers={**headers, "Content-Type": "application/json"},
+                              content=content, request=request)
@@ -1,4 +1,9 @@
 from backend.app.tasks.wearables import celery_app
+from backend.app.tasks import runtime  # noqa: F401  (per-process event loop + warm pools)
+from backend.app.tasks import tokens  # noqa: F401  (registers wearables.refresh_tokens)
+from backend.app.tasks import rollups  # noqa: F401  (registers rollup / partition tasks)
+from backend.app.tasks import analytics  # noqa: F401  (registers the Parquet snapshot export)
+from backend.app.tasks import monitoring  # noqa: F401  (task metrics + worker metrics server)
 
 # This exposes `celery_app` as `app` for `celery -A backend.worker worker`
 app = celery_app 
\ No newline at end of file